@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import generate_synthetic_highd
+import generate_synthetic_scenes
+
+# Each scale point sets the size of the synthetic highD recordings and of the synthetic scenes that are generated for it
+scales = {
+    "small": {"recordings": 2, "tracks": 100, "frames": 5000, "lanes": 6, "convoys": 5, "scenes": 115,
+              "thresholds": 5},
+    "medium": {"recordings": 4, "tracks": 400, "frames": 20000, "lanes": 6, "convoys": 20, "scenes": 1000,
+               "thresholds": 8},
+    "large": {"recordings": 8, "tracks": 1000, "frames": 40000, "lanes": 6, "convoys": 50, "scenes": 10000,
+              "thresholds": 11}
+}
+
+stage_names = ["extract_csv", "extract_json_meta", "extract_npz", "evaluate", "evaluate_sweep", "evaluate_bootstrap"]
+
+utilities_directory_path = os.path.dirname(os.path.abspath(__file__))
+
+
+# Runs a script in its own process, returning its wall time in seconds and its peak resident set size in megabytes.
+# The rusage of the process is collected by os.wait4, so that each stage reports only its own peak.
+def run_stage(script_name, script_args):
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(utilities_directory_path, script_name)] + script_args,
+                               stdout=subprocess.DEVNULL)
+    pid, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start_time
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode != 0:
+        raise ValueError(f"Stage {script_name} {' '.join(script_args)} failed with exit code {process.returncode}")
+
+    return wall_time, rusage.ru_maxrss / 1024
+
+
+def generate_scale(scale_name, scale, work_directory_path, seed):
+    highd_directory_path = os.path.join(work_directory_path, scale_name, "highd")
+    scenes_directory_path = os.path.join(work_directory_path, scale_name, "scenes")
+    os.makedirs(highd_directory_path)
+    os.makedirs(scenes_directory_path)
+
+    track_row_count = generate_synthetic_highd.generate(argparse.Namespace(
+        output_directory_path=highd_directory_path, recordings=scale["recordings"], tracks=scale["tracks"],
+        frames=scale["frames"], lanes=scale["lanes"], convoys=scale["convoys"], frame_rate=25.0, seed=seed))
+
+    thresholds = [f"{0.1 * k:.1f}" for k in range(scale["thresholds"])]
+    generate_synthetic_scenes.generate(argparse.Namespace(
+        output_directory_path=scenes_directory_path, scenes=scale["scenes"], thresholds=thresholds,
+        links_keys=["reward_causal_links", "agency_causal_links", "hybrid_causal_links"], maximum_independent_agents=5,
+        detection_probability=0.8, false_link_probability=0.05, seed=seed))
+
+    return highd_directory_path, track_row_count, scenes_directory_path, thresholds
+
+
+# The stages of both scripts measured at each scale point, as the stage name, the script, its arguments and the number
+# of input rows it processes, where the rows are the track rows for the extraction and the scene files for evaluation
+def scale_stages(scale, highd_directory_path, track_row_count, scenes_directory_path, thresholds, output_directory_path,
+                 jobs):
+    scene_file_path_expr = os.path.join(scenes_directory_path, thresholds[0], "*.json")
+    return [
+        ("extract_csv", "extract_two_agent_convoy_scenes.py",
+         [highd_directory_path, output_directory_path, "--csv", "--jobs", str(jobs)], track_row_count),
+        ("extract_json_meta", "extract_two_agent_convoy_scenes.py",
+         [highd_directory_path, output_directory_path, "--json-meta", "--jobs", str(jobs)], track_row_count),
+        ("extract_npz", "extract_two_agent_convoy_scenes.py",
+         [highd_directory_path, output_directory_path, "--npz", "--jobs", str(jobs)], track_row_count),
+        ("evaluate", "evaluate_performance.py",
+         [scene_file_path_expr, os.path.join(output_directory_path, "evaluation.json"), "--links-key",
+          "reward_causal_links", "--jobs", str(jobs)], scale["scenes"]),
+        ("evaluate_sweep", "evaluate_performance.py",
+         [scenes_directory_path, os.path.join(output_directory_path, "sweep.csv"), "--sweep", "--overwrite", "--jobs",
+          str(jobs)],
+         scale["scenes"] * len(thresholds)),
+        ("evaluate_bootstrap", "evaluate_performance.py",
+         [scene_file_path_expr, os.path.join(output_directory_path, "bootstrap.json"), "--links-key",
+          "reward_causal_links", "--bootstrap-resamples", "10000", "--jobs", str(jobs)], scale["scenes"])
+    ]
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=utilities_directory_path, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, baseline_results):
+    baseline_wall_times = {(result["scale"], result["stage"]): result["wall_time"] for result in baseline_results}
+    for result in results:
+        baseline_wall_time = baseline_wall_times.get((result["scale"], result["stage"]))
+        if baseline_wall_time is None:
+            continue
+        print(f"{result['scale']} {result['stage']}: {result['wall_time']:.3f}s against {baseline_wall_time:.3f}s "
+              f"({result['wall_time'] / baseline_wall_time:.2f}x)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmarks the extraction and evaluation on synthetic data")
+    arg_parser.add_argument("output_file_path")
+    arg_parser.add_argument("--scale", action="append", choices=list(scales.keys()))
+    arg_parser.add_argument("--stage", action="append", choices=stage_names)
+    arg_parser.add_argument("--repeats", type=int, default=1)
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--work-directory-path")
+    arg_parser.add_argument("--baseline-file-path")
+    args = arg_parser.parse_args()
+
+    if args.scale is None:
+        args.scale = ["small", "medium"]
+
+    if args.repeats < 1:
+        raise ValueError(f"Number of repeats {args.repeats} must be at least 1")
+
+    if args.jobs < 1:
+        raise ValueError(f"Number of jobs {args.jobs} must be at least 1")
+
+    if args.work_directory_path is not None and not os.path.isdir(args.work_directory_path):
+        raise ValueError(f"Work directory path {args.work_directory_path} is not a valid directory")
+
+    if args.baseline_file_path is not None and not os.path.isfile(args.baseline_file_path):
+        raise ValueError(f"Baseline file path {args.baseline_file_path} is not a valid file")
+
+    work_directory_path = tempfile.mkdtemp(dir=args.work_directory_path)
+
+    results = []
+    try:
+        for scale_name in args.scale:
+            scale = scales[scale_name]
+            print(f"Generating {scale_name} scale data")
+            highd_directory_path, track_row_count, scenes_directory_path, thresholds = generate_scale(
+                scale_name, scale, work_directory_path, args.seed)
+
+            output_directory_path = os.path.join(work_directory_path, scale_name, "output")
+            stages = scale_stages(scale, highd_directory_path, track_row_count, scenes_directory_path, thresholds,
+                                  output_directory_path, args.jobs)
+            for stage_name, script_name, script_args, row_count in stages:
+                if args.stage is not None and stage_name not in args.stage:
+                    continue
+
+                # The fastest of the repeats is reported, alongside the highest peak memory usage
+                wall_times = []
+                peak_rss = 0
+                for repeat in range(args.repeats):
+                    shutil.rmtree(output_directory_path, ignore_errors=True)
+                    os.makedirs(output_directory_path)
+                    wall_time, stage_peak_rss = run_stage(script_name, script_args)
+                    wall_times.append(wall_time)
+                    peak_rss = max(peak_rss, stage_peak_rss)
+
+                result = {
+                    "scale": scale_name,
+                    "stage": stage_name,
+                    "parameters": scale,
+                    "rows": row_count,
+                    "wall_time": min(wall_times),
+                    "wall_times": wall_times,
+                    "peak_rss_mb": peak_rss,
+                    "rows_per_second": row_count / min(wall_times)
+                }
+                results.append(result)
+                print(f"{scale_name} {stage_name}: {result['wall_time']:.3f}s, {result['peak_rss_mb']:.1f} MB, "
+                      f"{result['rows_per_second']:.0f} rows/s")
+    finally:
+        shutil.rmtree(work_directory_path, ignore_errors=True)
+
+    with open(args.output_file_path, "w") as output_file:
+        json.dump({
+            "commit": current_commit(),
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "jobs": args.jobs,
+            "seed": args.seed,
+            "results": results
+        }, output_file, indent=4)
+
+    if args.baseline_file_path is not None:
+        with open(args.baseline_file_path, "r") as baseline_file:
+            print_comparison(results, json.load(baseline_file)["results"])
+
+
+if __name__ == "__main__":
+    main()
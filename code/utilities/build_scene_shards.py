@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import os
+
+import evaluate_performance
+import scene_shards
+
+
+# Gathers the scene files of a directory into a single shard, in the same order in which they are evaluated, returning
+# the number of scenes written
+def build_shard(directory_path, shard_name):
+    scene_file_paths = sorted(glob.glob(os.path.join(directory_path, "*.json")))
+    if len(scene_file_paths) == 0:
+        return 0
+
+    shard_file_path = os.path.join(directory_path, f"{shard_name}{scene_shards.shard_file_extension}")
+    with scene_shards.SceneShardWriter(shard_file_path) as shard_writer:
+        for scene_file_path in scene_file_paths:
+            with open(scene_file_path, "rb") as scene_file:
+                shard_writer.add(scene_shards.scene_name(scene_file_path), scene_shards.loads(scene_file.read()))
+
+    print(f"Wrote {len(scene_file_paths)} scenes to {shard_file_path}")
+
+    return len(scene_file_paths)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Gathers the scene files of a directory into a JSON Lines shard")
+    arg_parser.add_argument("input_directory_path")
+    arg_parser.add_argument("--sweep", action="store_true")
+    arg_parser.add_argument("--shard-name", default="scenes")
+    args = arg_parser.parse_args()
+
+    if not os.path.isdir(args.input_directory_path):
+        raise ValueError(f"Input directory path {args.input_directory_path} is not a valid directory")
+
+    if os.path.basename(args.shard_name) != args.shard_name or args.shard_name in ("", ".", ".."):
+        raise ValueError(f"Shard name {args.shard_name} must be a plain file name")
+
+    if args.sweep:
+        directory_paths = [os.path.join(args.input_directory_path, threshold_name) for threshold_name
+                           in evaluate_performance.threshold_directory_names(args.input_directory_path)]
+    else:
+        directory_paths = [args.input_directory_path]
+
+    scene_count = 0
+    shard_count = 0
+    for directory_path in directory_paths:
+        directory_scene_count = build_shard(directory_path, args.shard_name)
+        if directory_scene_count > 0:
+            scene_count += directory_scene_count
+            shard_count += 1
+
+    if shard_count == 0:
+        raise ValueError(f"No scene files found under {args.input_directory_path}")
+
+    print(f"Wrote {scene_count} scenes to {shard_count} shards")
+
+
+if __name__ == "__main__":
+    main()
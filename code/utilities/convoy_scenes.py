@@ -0,0 +1,528 @@
+import csv
+import json
+import os
+import shutil
+import numpy as np
+
+import extraction_profile
+import highd_loader
+import scene_io
+import scene_shards
+
+minimum_time_window_threshold = 10.0
+maximum_convoy_distance_headway_threshold = 10.0
+minimum_clearance_distance_headway_threshold = 20.0
+velocity_proportional_diff_threshold = 0.2
+
+count_names = ["success", "preceding", "no_following", "following_is_not_valid_convoy", "following_is_too_far",
+               "too_short_before_other", "no_suitable_other"]
+
+
+# The thresholds of the extraction. The parsed arguments of the extraction script may be used in place of these, as
+# they carry the same attributes.
+class SceneParameters:
+    def __init__(self, minimum_time_window_threshold=minimum_time_window_threshold,
+                 maximum_convoy_distance_headway_threshold=maximum_convoy_distance_headway_threshold,
+                 minimum_clearance_distance_headway_threshold=minimum_clearance_distance_headway_threshold,
+                 velocity_proportional_diff_threshold=velocity_proportional_diff_threshold):
+        self.minimum_time_window_threshold = minimum_time_window_threshold
+        self.maximum_convoy_distance_headway_threshold = maximum_convoy_distance_headway_threshold
+        self.minimum_clearance_distance_headway_threshold = minimum_clearance_distance_headway_threshold
+        self.velocity_proportional_diff_threshold = velocity_proportional_diff_threshold
+
+
+# One highD recording, whose files are only parsed once they are first needed, and then only once. The time spent
+# parsing each file is recorded against the given profile. When streaming, the tracks file is read in chunks of the
+# given size and only the frames of the agents of each scene are parsed in full, so that memory use does not grow with
+# the size of the recording.
+class Recording:
+    def __init__(self, input_directory_path, recording_id, tracks_cache_file_path=None,
+                 profile=extraction_profile.null_profile, streaming=False,
+                 streaming_chunk_bytes=highd_loader.streaming_chunk_bytes):
+        self.recording_id = recording_id
+        self.recording_meta_file_path = os.path.join(input_directory_path, f"{recording_id}_recordingMeta.csv")
+        self.tracks_meta_file_path = os.path.join(input_directory_path, f"{recording_id}_tracksMeta.csv")
+        self.tracks_file_path = os.path.join(input_directory_path, f"{recording_id}_tracks.csv")
+        self.tracks_cache_file_path = tracks_cache_file_path
+        self.profile = profile
+        self.streaming = streaming
+        self.streaming_chunk_bytes = streaming_chunk_bytes
+
+        self._recording_meta = None
+        self._tracks_meta = None
+        self._tracks = None
+        self._tracks_meta_rows = None
+        self._tracks_rows = None
+        self._valid_tracks = {}
+
+    @property
+    def recording_meta(self):
+        if self._recording_meta is None:
+            with self.profile.stage("recording_meta_parsing", rows=1):
+                self._recording_meta = highd_loader.RecordingMeta(self.recording_meta_file_path)
+        return self._recording_meta
+
+    @property
+    def tracks_meta(self):
+        if self._tracks_meta is None:
+            with self.profile.stage("tracks_meta_parsing"):
+                self._tracks_meta = highd_loader.TracksMeta(self.tracks_meta_file_path)
+            self.profile.add_rows("tracks_meta_parsing", len(self._tracks_meta))
+        return self._tracks_meta
+
+    @property
+    def tracks(self):
+        if self._tracks is None:
+            with self.profile.stage("tracks_parsing"):
+                if self.streaming:
+                    self._tracks = highd_loader.StreamingTracks(self.tracks_file_path,
+                                                                highd_loader.extraction_track_columns,
+                                                                self.streaming_chunk_bytes)
+                else:
+                    self._tracks = highd_loader.Tracks(self.tracks_file_path, highd_loader.extraction_track_columns,
+                                                       self.tracks_cache_file_path)
+            self.profile.add_rows("tracks_parsing", len(self._tracks))
+        return self._tracks
+
+    # The unparsed rows of the metadata and tracks files, from which trimmed scenes are copied. When streaming, the rows
+    # of the tracks file are left on disk and copied out of it track by track.
+    def load_raw_rows(self):
+        if self._tracks_rows is None:
+            with self.profile.stage("trimmed_scene_reading"):
+                self._tracks_meta_rows = highd_loader.RawRows(self.tracks_meta_file_path)
+                if self.streaming:
+                    self._tracks_rows = self.tracks.raw_rows()
+                else:
+                    self._tracks_rows = highd_loader.RawRows(self.tracks_file_path)
+            self.profile.add_rows("trimmed_scene_reading", len(self._tracks_meta_rows) + len(self._tracks_rows))
+        return self._tracks_meta_rows, self._tracks_rows
+
+    @property
+    def frame_rate(self):
+        return self.recording_meta["frameRate"]
+
+    # The valid agents of the recording, mapped onto their metadata row, alongside those that are also valid convoy
+    # agents, in metadata order
+    def valid_tracks(self, params):
+        key = (params.minimum_time_window_threshold, params.velocity_proportional_diff_threshold)
+        if key not in self._valid_tracks:
+            tracks_meta = self.tracks_meta
+            with self.profile.stage("convoy_filtering", rows=len(tracks_meta)):
+                valid_mask = (tracks_meta["numLaneChanges"] == 0) \
+                    & (tracks_meta["numFrames"] / self.frame_rate >= params.minimum_time_window_threshold)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    convoy_mask = valid_mask & (np.abs(tracks_meta["maxXVelocity"] - tracks_meta["minXVelocity"])
+                                                / np.abs(tracks_meta["maxXVelocity"])
+                                                >= params.velocity_proportional_diff_threshold)
+
+                track_ids = tracks_meta["id"].tolist()
+
+                valid_tracks = {}
+                for index in np.flatnonzero(valid_mask).tolist():
+                    valid_tracks[track_ids[index]] = index
+
+                valid_convoy_tracks = {}
+                for index in np.flatnonzero(convoy_mask).tolist():
+                    valid_convoy_tracks[track_ids[index]] = -1
+
+            self._valid_tracks[key] = valid_tracks, valid_convoy_tracks
+        return self._valid_tracks[key]
+
+
+def distance_travelled(frames, frame_count):
+    distances = np.zeros(frame_count)
+    if frame_count > 1:
+        np.cumsum(np.hypot(np.diff(frames["x"][:frame_count]), np.diff(frames["y"][:frame_count])), out=distances[1:])
+    return distances
+
+
+def scene_time_series(followed_frames, follower_frames, independent_frames_dict, velocity_variables, all_kinematic_variables):
+    if all_kinematic_variables:
+        variables = ["a", "v", "p"]
+    elif velocity_variables:
+        variables = ["v"]
+    else:
+        variables = ["a"]
+
+    agents = [("c0", followed_frames), ("c1", follower_frames)]
+    for i, independent_id in enumerate(independent_frames_dict.keys()):
+        agents.append((f"i{i}", independent_frames_dict[independent_id]))
+
+    frame_count = min(len(followed_frames), len(follower_frames))
+
+    field_names = []
+    columns = []
+    for agent_name, frames in agents:
+        for variable in variables:
+            field_names.append(f"{agent_name}.{variable}")
+            if variable == "a":
+                columns.append(frames["xAcceleration"][:frame_count])
+            elif variable == "v":
+                columns.append(frames["xVelocity"][:frame_count])
+            else:
+                columns.append(distance_travelled(frames, frame_count))
+
+    return field_names, np.column_stack(columns)
+
+
+# A convoy scene, with the frames of each of its agents trimmed to its frame window as views onto the columns of the
+# recording's tracks
+class ConvoyScene:
+    def __init__(self, recording, convoy_head_id, convoy_tail_id, independent_ids, first_frame, last_frame,
+                 head_frames, tail_frames, independent_frames):
+        self.recording = recording
+        self.convoy_head_id = convoy_head_id
+        self.convoy_tail_id = convoy_tail_id
+        self.independent_ids = independent_ids
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.head_frames = head_frames
+        self.tail_frames = tail_frames
+        self.independent_frames = independent_frames
+        self._time_series = {}
+
+    @property
+    def file_name(self):
+        return (f"scene-{self.recording.recording_id}-{self.convoy_tail_id}_follows_{self.convoy_head_id}-"
+                f"{len(self.independent_ids)}_independent")
+
+    def meta(self):
+        return {
+            "scene_id": self.recording.recording_id,
+            "convoy_head_id": self.convoy_head_id,
+            "convoy_tail_id": self.convoy_tail_id,
+            "independent_ids": self.independent_ids,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame
+        }
+
+    # The column names and matrix of the scene's time series, built once for each selection of variables
+    def time_series(self, velocity_variables=False, all_kinematic_variables=False):
+        key = (velocity_variables, all_kinematic_variables)
+        if key not in self._time_series:
+            with self.recording.profile.stage("time_series"):
+                self._time_series[key] = scene_time_series(self.head_frames, self.tail_frames, self.independent_frames,
+                                                           velocity_variables, all_kinematic_variables)
+            self.recording.profile.add_rows("time_series", len(self._time_series[key][1]))
+        return self._time_series[key]
+
+
+# Valid tracks in the order in which they are considered as independent agents, indexed by their lifetimes so that
+# those overlapping a frame window can be found by bisection rather than by scanning every track
+class IndependentAgentIndex:
+    def __init__(self, valid_tracks, initial_frames, final_frames, tracks):
+        self.track_ids = np.array(list(valid_tracks.keys()), dtype=np.int64)
+        self.initial_frames = np.array([initial_frames[index] for index in valid_tracks.values()], dtype=np.int64)
+        self.final_frames = np.array([final_frames[index] for index in valid_tracks.values()], dtype=np.int64)
+        self.initial_lane_ids = np.array([tracks.initial_lane_id(track_id) for track_id in valid_tracks.keys()],
+                                         dtype=np.int64)
+        self.used = np.zeros(len(self.track_ids), dtype=bool)
+        self.positions = {track_id: position for position, track_id in enumerate(valid_tracks.keys())}
+
+        self.lifetime_order = np.argsort(self.initial_frames, kind="stable")
+        self.sorted_initial_frames = self.initial_frames[self.lifetime_order]
+        if len(self.track_ids) > 0:
+            self.maximum_lifetime = int(np.max(self.final_frames - self.initial_frames))
+        else:
+            self.maximum_lifetime = 0
+
+    def initial_lane_id(self, track_id):
+        return int(self.initial_lane_ids[self.positions[track_id]])
+
+    def mark_used(self, track_id):
+        position = self.positions.get(track_id)
+        if position is not None:
+            self.used[position] = True
+
+    def accept(self, position):
+        self.used[position] = True
+        return int(self.track_ids[position])
+
+    # Positions, in selection order, of unused tracks that overlap the window by at least the minimum time window
+    # threshold and that start out in a lane which has not been used yet
+    def query(self, first_frame, last_frame, used_lanes, frame_rate, minimum_time_window_threshold):
+        start = np.searchsorted(self.sorted_initial_frames, first_frame - self.maximum_lifetime, side="left")
+        stop = np.searchsorted(self.sorted_initial_frames, last_frame, side="right")
+        positions = np.sort(self.lifetime_order[start:stop])
+
+        positions = positions[~self.used[positions]]
+        window_lengths = (np.minimum(last_frame, self.final_frames[positions])
+                          - np.maximum(first_frame, self.initial_frames[positions]))
+        positions = positions[window_lengths / frame_rate >= minimum_time_window_threshold]
+        return positions[~np.isin(self.initial_lane_ids[positions], used_lanes)]
+
+
+# Yields each convoy scene of the recording in turn. Independent agents are claimed by the scenes in the order in which
+# they are yielded, so the scenes are the same whether or not each is consumed before the next is found. Where a counts
+# dict is given, the number of successes and of each kind of failure are added to it.
+def find_convoy_scenes(recording, params, counts=None):
+    if counts is None:
+        counts = dict.fromkeys(count_names, 0)
+
+    if recording.recording_meta.values is None:
+        return
+
+    profile = recording.profile
+    frame_rate = recording.frame_rate
+
+    valid_tracks, valid_convoy_tracks = recording.valid_tracks(params)
+    if len(valid_convoy_tracks.keys()) == 0:
+        return
+
+    tracks_meta = recording.tracks_meta
+    initial_frames = tracks_meta["initialFrame"].tolist()
+    final_frames = tracks_meta["finalFrame"].tolist()
+    min_dhws = tracks_meta["minDHW"].tolist()
+
+    tracks = recording.tracks
+
+    with profile.stage("independent_search"):
+        independent_index = IndependentAgentIndex(valid_tracks, initial_frames, final_frames, tracks)
+
+    for valid_convoy_track in valid_convoy_tracks.keys():
+        with profile.stage("convoy_filtering", rows=1):
+            metadata = valid_tracks[valid_convoy_track]
+
+            if 0.0 <= min_dhws[metadata] < params.minimum_clearance_distance_headway_threshold:
+                counts["preceding"] += 1
+                continue
+
+            following = tracks.following(valid_convoy_track)
+            if following is None:
+                counts["no_following"] += 1
+                continue
+
+            following_id, lane_id = following
+
+            if valid_convoy_tracks.get(following_id) is None:
+                counts["following_is_not_valid_convoy"] += 1
+                continue
+
+            following_metadata = valid_tracks[following_id]
+
+            if (min_dhws[following_metadata] < 0.0 or
+                    min_dhws[following_metadata] >= params.maximum_convoy_distance_headway_threshold):
+                counts["following_is_too_far"] += 1
+                continue
+
+            latest_initial_frame = max(initial_frames[metadata], initial_frames[following_metadata])
+            earliest_final_frame = min(final_frames[metadata], final_frames[following_metadata])
+
+            if (earliest_final_frame - latest_initial_frame) / frame_rate < params.minimum_time_window_threshold:
+                counts["too_short_before_other"] += 1
+                continue
+
+        with profile.stage("independent_search", rows=1):
+            used_lanes = [lane_id]
+            independent_ids = []
+            updated_latest_initial_frame = latest_initial_frame
+            updated_earliest_final_frame = earliest_final_frame
+            while True:
+                candidates = independent_index.query(updated_latest_initial_frame, updated_earliest_final_frame,
+                                                     used_lanes, frame_rate, params.minimum_time_window_threshold)
+                if len(candidates) == 0:
+                    break
+
+                valid_track = independent_index.accept(candidates[0])
+
+                updated_latest_initial_frame = max(updated_latest_initial_frame,
+                                                   initial_frames[valid_tracks[valid_track]])
+                updated_earliest_final_frame = min(updated_earliest_final_frame, final_frames[valid_tracks[valid_track]])
+
+                used_lanes.append(independent_index.initial_lane_id(valid_track))
+
+                independent_ids.append(valid_track)
+
+                independent_index.mark_used(valid_convoy_track)
+                independent_index.mark_used(following_id)
+
+        if len(used_lanes) == 1:
+            counts["no_suitable_other"] += 1
+            continue
+        else:
+            counts["success"] += 1
+
+        # The frames of each agent are only fetched once the scene is known to be a success, as when streaming this
+        # means parsing them from the tracks file
+        with profile.stage("frame_trimming", rows=2 + len(independent_ids)):
+            updated_frames = tracks.frames(valid_convoy_track).between(updated_latest_initial_frame,
+                                                                       updated_earliest_final_frame)
+
+            updated_following_frames = tracks.frames(following_id).between(updated_latest_initial_frame,
+                                                                            updated_earliest_final_frame)
+
+            updated_independent_frames_dict = {}
+            for independent_id in independent_ids:
+                updated_independent_frames_dict[independent_id] = tracks.frames(independent_id).between(
+                    updated_latest_initial_frame, updated_earliest_final_frame)
+
+        yield ConvoyScene(recording, valid_convoy_track, following_id, independent_ids,
+                          updated_latest_initial_frame, updated_earliest_final_frame, updated_frames,
+                          updated_following_frames, updated_independent_frames_dict)
+
+
+# Writers each output a scene in one format, returning the paths of the files written. Anything a writer needs beyond
+# the scene itself is loaded in prepare, which is called before each write so that the time spent loading is not
+# counted against the writing. Writers gathering the scenes of a recording into one file write it out in close, which
+# is called once every scene of the recording has been written. Only verbose writers print each file as they write it.
+class SceneWriter:
+    stage_name = None
+    verbose = False
+
+    def announce(self, output_file_path):
+        if self.verbose:
+            print(f"Generating output for {output_file_path}")
+
+    def prepare(self, scene):
+        pass
+
+    def write(self, scene):
+        raise NotImplementedError
+
+    def close(self):
+        return []
+
+
+class CsvSceneWriter(SceneWriter):
+    stage_name = "csv_writing"
+
+    def __init__(self, output_directory_path, velocity_variables=False, all_kinematic_variables=False, verbose=False):
+        self.output_directory_path = output_directory_path
+        self.velocity_variables = velocity_variables
+        self.all_kinematic_variables = all_kinematic_variables
+        self.verbose = verbose
+
+    def prepare(self, scene):
+        scene.time_series(self.velocity_variables, self.all_kinematic_variables)
+
+    def write(self, scene):
+        field_names, time_series = scene.time_series(self.velocity_variables, self.all_kinematic_variables)
+        output_file_path = os.path.join(self.output_directory_path, f"{scene.file_name}.csv")
+        self.announce(output_file_path)
+
+        rows = time_series.tolist()
+
+        with open(output_file_path, "w") as output_file:
+            csv_writer = csv.writer(output_file)
+            csv_writer.writerow(["time_index"] + field_names)
+            csv_writer.writerows([time_index] + row for time_index, row in enumerate(rows))
+
+        return [output_file_path]
+
+
+class NpzSceneWriter(CsvSceneWriter):
+    stage_name = "npz_writing"
+
+    def write(self, scene):
+        field_names, time_series = scene.time_series(self.velocity_variables, self.all_kinematic_variables)
+        output_file_path = os.path.join(self.output_directory_path, f"{scene.file_name}.npz")
+        self.announce(output_file_path)
+
+        scene_io.write_scene_npz(output_file_path, field_names, time_series, scene.meta())
+
+        return [output_file_path]
+
+
+class ParquetSceneWriter(CsvSceneWriter):
+    stage_name = "parquet_writing"
+
+    def write(self, scene):
+        field_names, time_series = scene.time_series(self.velocity_variables, self.all_kinematic_variables)
+        output_file_path = os.path.join(self.output_directory_path, f"{scene.file_name}.parquet")
+        self.announce(output_file_path)
+
+        scene_io.write_scene_parquet(output_file_path, field_names, time_series, scene.meta())
+
+        return [output_file_path]
+
+
+class JsonMetaSceneWriter(SceneWriter):
+    stage_name = "json_meta_writing"
+
+    def __init__(self, output_directory_path, verbose=False):
+        self.output_directory_path = output_directory_path
+        self.verbose = verbose
+
+    def scene_json(self, scene):
+        return {
+            "scene_id": scene.recording.recording_id,
+            "convoy_head_id": scene.convoy_head_id,
+            "convoy_tail_id": scene.convoy_tail_id,
+            "independent_ids": scene.independent_ids
+        }
+
+    def write(self, scene):
+        output_file_path = os.path.join(self.output_directory_path, f"{scene.file_name}.json")
+        self.announce(output_file_path)
+
+        with open(output_file_path, "w") as output_file:
+            json.dump(self.scene_json(scene), output_file)
+
+        return [output_file_path]
+
+
+# Gathers the JSON metadata of every scene of a recording into a single scenes-{recording}.jsonl shard, which is only
+# written where the recording has any scenes
+class JsonMetaShardSceneWriter(JsonMetaSceneWriter):
+    stage_name = "json_meta_shard_writing"
+
+    def __init__(self, output_directory_path, verbose=False):
+        super().__init__(output_directory_path, verbose)
+        self.shard_writer = None
+
+    def write(self, scene):
+        if self.shard_writer is None:
+            output_file_path = os.path.join(self.output_directory_path, f"scenes-{scene.recording.recording_id}"
+                                                                        f"{scene_shards.shard_file_extension}")
+            self.announce(output_file_path)
+            self.shard_writer = scene_shards.SceneShardWriter(output_file_path)
+
+        self.shard_writer.add(scene.file_name, self.scene_json(scene))
+
+        return []
+
+    def close(self):
+        if self.shard_writer is None:
+            return []
+
+        output_file_paths = self.shard_writer.close()
+        self.shard_writer = None
+        return output_file_paths
+
+
+# Copies the rows of every track present during the scene's frame window out of the recording's files, as a trimmed
+# version of the base highD format
+class TrimmedSceneWriter(SceneWriter):
+    stage_name = "trimmed_scene_writing"
+
+    def __init__(self, output_directory_path, verbose=False):
+        self.output_directory_path = output_directory_path
+        self.verbose = verbose
+
+    def prepare(self, scene):
+        scene.recording.load_raw_rows()
+
+    def write(self, scene):
+        recording = scene.recording
+        tracks_meta = recording.tracks_meta
+        tracks = recording.tracks
+        tracks_meta_rows, tracks_rows = recording.load_raw_rows()
+        output_file_path_prefix = os.path.join(self.output_directory_path, scene.file_name)
+
+        shutil.copy(recording.recording_meta_file_path, f"{output_file_path_prefix}-recordingMeta.csv")
+
+        present_mask = (tracks_meta["initialFrame"] < scene.last_frame) & (tracks_meta["finalFrame"] > scene.first_frame)
+        present_indices = np.flatnonzero(present_mask)
+
+        with open(f"{output_file_path_prefix}-tracksMeta.csv", "w") as tracks_meta_output_file:
+            tracks_meta_rows.write_csv(tracks_meta_output_file,
+                                       highd_loader.merge_row_ranges(present_indices, present_indices + 1))
+
+        present_runs = np.flatnonzero(np.isin(tracks.run_ids, tracks_meta["id"][present_indices]))
+
+        with open(f"{output_file_path_prefix}-tracks.csv", "w") as tracks_output_file:
+            tracks_rows.write_csv(tracks_output_file,
+                                  highd_loader.merge_row_ranges(tracks.offsets[present_runs],
+                                                                tracks.offsets[present_runs] + tracks.lengths[present_runs]))
+
+        return [f"{output_file_path_prefix}-{suffix}.csv" for suffix in ("recordingMeta", "tracksMeta", "tracks")]
@@ -1,14 +1,34 @@
 #!/usr/bin/python3
 
-import copy
 import os
 import argparse
+import csv
+import functools
 import json
 import glob
+import hashlib
+import multiprocessing
+import pickle
+import re
 import statistics
+import numpy as np
 
+import scene_shards
+from performance_statistics import Resampler, paired_scene_counts, read_scene_counts
 
-def calculate_scene_performance(causal_links, total_possible_links):
+# The per-scene counts of an evaluation are a CSV table of their own, apart from its performance_detail file, as they
+# name each scene so that the scenes of two evaluations can be paired
+scene_counts_field_names = ["scene", "tp", "fp", "fn", "tn", "precision", "fallout", "recall", "f1_score",
+                            "execution_time"]
+
+performance_detail_header = ("o_pres_a, o_fall_a, o_rec_a, o_fscore_a, o_pres_o, o_fall_o, o_rec_o, o_fscore_o, "
+                             "computational_time")
+
+
+# The original link counting, which remains the default so as to reproduce the published evaluations. Where a cause
+# has several effects of the same kind only the last is kept, so that any earlier links of that cause go uncounted, and
+# a pair linked in both directions is counted once only where the two directions are listed in a particular order.
+def calculate_scene_performance(causal_links, convoy_head_id, convoy_tail_id, total_possible_links):
     tp_count = 0
     fp_count = 0
     fn_count = 0
@@ -49,67 +69,759 @@ def calculate_scene_performance(causal_links, total_possible_links):
     return tp_count, fp_count, fn_count, tn_count
 
 
-arg_parser = argparse.ArgumentParser()
-arg_parser.add_argument("input_path_expr")
-arg_parser.add_argument("output_file_path")
-args = arg_parser.parse_args()
+# Maps the agent ids of a scene onto dense indices, with the convoy head at 0, the convoy tail at 1 and the independent
+# agents following in order, and marks each discovered link from cause to effect within a boolean adjacency matrix
+def scene_adjacency(causal_links, convoy_head_id, convoy_tail_id, independent_ids):
+    agent_indices = {convoy_head_id: 0}
+    agent_indices.setdefault(convoy_tail_id, 1)
+    for independent_id in independent_ids:
+        agent_indices.setdefault(independent_id, len(agent_indices))
+
+    links = []
+    for cause_str in causal_links:
+        cause_index = agent_indices.setdefault(int(cause_str), len(agent_indices))
+        for effect_str in causal_links[cause_str]:
+            links.append((cause_index, agent_indices.setdefault(int(effect_str), len(agent_indices))))
+
+    adjacency = np.zeros((len(agent_indices), len(agent_indices)), dtype=bool)
+    if len(links) > 0:
+        links = np.array(links)
+        adjacency[links[:, 0], links[:, 1]] = True
+
+    return adjacency
+
+
+def stack_adjacencies(adjacencies):
+    agent_count = max([2] + [len(adjacency) for adjacency in adjacencies])
+    adjacency_stack = np.zeros((len(adjacencies), agent_count, agent_count), dtype=bool)
+    for j, adjacency in enumerate(adjacencies):
+        adjacency_stack[j, :len(adjacency), :len(adjacency)] = adjacency
+    return adjacency_stack
+
+
+# Scores a stack of scene adjacency matrices at once. A link is counted once per pair of agents regardless of its
+# direction, so that a link discovered in both directions is a single link, and each distinct pair is counted exactly
+# once. The link between the convoy head and tail is the only true link, so it is missed whenever it is not discovered.
+# Returns the TP, FP, FN and TN counts of each scene as the rows of an array.
+def calculate_confusion_counts(adjacency_stack, total_possible_links):
+    undirected = adjacency_stack | adjacency_stack.transpose(0, 2, 1)
+    upper_triangle = np.triu(np.ones(undirected.shape[1:], dtype=bool), k=1)
+    link_counts = np.count_nonzero(undirected & upper_triangle, axis=(1, 2))
+
+    tp_counts = undirected[:, 0, 1].astype(np.int64)
+    fp_counts = link_counts - tp_counts
+    fn_counts = 1 - tp_counts
+    tn_counts = np.asarray(total_possible_links) - (tp_counts + fp_counts + fn_counts)
+
+    return np.stack((tp_counts, fp_counts, fn_counts, tn_counts), axis=1)
+
+
+# Scores a stack of scene adjacency matrices with regard to the direction of each link, as the performance files of the
+# other methods do. Every discovered link other than the one from the convoy head to the convoy tail is a false
+# positive, including the link from the tail to the head, so that the TN count may fall below zero and the fallout rise
+# above one where a method links many pairs in both directions.
+def calculate_oriented_confusion_counts(adjacency_stack, total_possible_links):
+    off_diagonal = ~np.eye(adjacency_stack.shape[1], dtype=bool)
+    link_counts = np.count_nonzero(adjacency_stack & off_diagonal, axis=(1, 2))
+
+    tp_counts = adjacency_stack[:, 0, 1].astype(np.int64)
+    fp_counts = link_counts - tp_counts
+    fn_counts = 1 - tp_counts
+    tn_counts = np.asarray(total_possible_links) - (tp_counts + fp_counts + fn_counts)
+
+    return np.stack((tp_counts, fp_counts, fn_counts, tn_counts), axis=1)
+
+
+def calculate_metrics(tp_count, fp_count, fn_count, tn_count):
+    if tp_count + fp_count == 0:
+        precision = 0
+    else:
+        precision = tp_count / (tp_count + fp_count)
+
+    if fp_count + tn_count == 0:
+        fallout = 0
+    else:
+        fallout = fp_count / (fp_count + tn_count)
+
+    recall = tp_count / (tp_count + fn_count)
+
+    f1_score = (2 * tp_count) / (2 * tp_count + fp_count + fn_count)
+
+    return precision, fallout, recall, f1_score
+
+
+def evaluate_scene(input_file_path, links_keys, pair_link_counting=False, oriented=False):
+    with open(input_file_path, "rb") as input_file:
+        causal_discovery_json = scene_shards.loads(input_file.read())
+
+    return evaluate_scene_json(causal_discovery_json, links_keys, pair_link_counting, oriented)
+
+
+# Evaluates every scene of an input file, which is either a single scene file or a shard of many scenes
+def evaluate_input(input_file_path, links_keys, pair_link_counting=False, oriented=False):
+    if scene_shards.is_shard_file_path(input_file_path):
+        return [evaluate_scene_json(causal_discovery_json, links_keys, pair_link_counting, oriented)
+                for causal_discovery_json in scene_shards.SceneShard(input_file_path).scenes()]
+    return [evaluate_scene(input_file_path, links_keys, pair_link_counting, oriented)]
+
+
+def input_scene_names(input_file_path):
+    if scene_shards.is_shard_file_path(input_file_path):
+        return scene_shards.SceneShard(input_file_path).names
+    return [scene_shards.scene_name(input_file_path)]
+
+
+# The key under which the oriented counts of a set of causal links are kept beside its counts
+def oriented_links_key(links_key):
+    return f"{links_key}:oriented"
+
+
+# Scores the causal links of a scene under each key, and where requested, with regard to the direction of each link as
+# well, as the performance_detail files of the other methods do
+def evaluate_scene_json(causal_discovery_json, links_keys, pair_link_counting=False, oriented=False):
+    convoy_head_id = causal_discovery_json["convoy_head_id"]
+    convoy_tail_id = causal_discovery_json["convoy_tail_id"]
+    independent_ids = causal_discovery_json["independent_ids"]
+
+    n = 2 + len(independent_ids)
+    total_possible_links = int((n * (n - 1)) / 2)
+
+    scene_links = {}
+    for links_key in links_keys:
+        if not pair_link_counting:
+            scene_links[links_key] = calculate_scene_performance(causal_discovery_json[links_key], convoy_head_id,
+                                                                 convoy_tail_id, total_possible_links)
+        else:
+            scene_links[links_key] = scene_adjacency(causal_discovery_json[links_key], convoy_head_id, convoy_tail_id,
+                                                     independent_ids)
+
+        if oriented:
+            adjacency = scene_links[links_key] if pair_link_counting else scene_adjacency(
+                causal_discovery_json[links_key], convoy_head_id, convoy_tail_id, independent_ids)
+            scene_links[oriented_links_key(links_key)] = tuple(
+                calculate_oriented_confusion_counts(adjacency[np.newaxis], total_possible_links)[0].tolist())
+
+    ground_truth = (convoy_head_id, convoy_tail_id, tuple(independent_ids))
+
+    return ground_truth, scene_links, causal_discovery_json["time_elapsed_in_microseconds"] / 1.0e6
+
+
+def find_links_keys(input_file_path):
+    if scene_shards.is_shard_file_path(input_file_path):
+        shard = scene_shards.SceneShard(input_file_path)
+        if len(shard) == 0:
+            raise ValueError(f"Shard {input_file_path} holds no scenes")
+        return json_links_keys(shard.scene(shard.names[0]))
+
+    with open(input_file_path, "rb") as input_file:
+        causal_discovery_json = scene_shards.loads(input_file.read())
+
+    return json_links_keys(causal_discovery_json)
+
+
+def json_links_keys(causal_discovery_json):
+    return [key for key in causal_discovery_json.keys() if key.endswith("causal_links")]
+
+
+# Yields the evaluation of each scene in input order, whether the scenes are evaluated in this process or spread over
+# a worker pool. Each shard is read and evaluated by a single worker.
+def scene_results(input_file_paths, links_keys, jobs, pair_link_counting=False, oriented=False):
+    evaluate_input_function = functools.partial(evaluate_input, links_keys=links_keys,
+                                                pair_link_counting=pair_link_counting, oriented=oriented)
+
+    if jobs == 1:
+        for results in map(evaluate_input_function, input_file_paths):
+            yield from results
+        return
+
+    with multiprocessing.Pool(jobs) as pool:
+        for results in pool.imap(evaluate_input_function, input_file_paths,
+                                 chunksize=max(1, len(input_file_paths) // (jobs * 8))):
+            yield from results
+        pool.close()
+        pool.join()
+
+
+# Scores the adjacency matrices of a batch of scenes, passing any counts the scenes already hold, such as their oriented
+# counts, through unchanged
+def score_batch(batch, links_keys):
+    total_possible_links = [int(((2 + len(ground_truth[2])) * (1 + len(ground_truth[2]))) / 2)
+                            for ground_truth, scene_links, execution_time in batch]
+
+    batch_counts = [{key: value for key, value in scene_links.items() if key not in links_keys}
+                    for ground_truth, scene_links, execution_time in batch]
+    for links_key in links_keys:
+        adjacency_stack = stack_adjacencies([scene_links[links_key] for ground_truth, scene_links, execution_time in batch])
+        for j, counts in enumerate(calculate_confusion_counts(adjacency_stack, total_possible_links).tolist()):
+            batch_counts[j][links_key] = tuple(counts)
+
+    return [(ground_truth, counts, execution_time)
+            for (ground_truth, scene_links, execution_time), counts in zip(batch, batch_counts)]
+
+
+# Yields the TP, FP, FN and TN counts of each scene in input order. Where the pair link counting is requested the
+# scenes are scored in batches, so that each batch of adjacency matrices is scored in a single stacked operation.
+def scored_scene_results(input_file_paths, links_keys, jobs, pair_link_counting=False, batch_size=4096,
+                         oriented=False):
+    results = scene_results(input_file_paths, links_keys, jobs, pair_link_counting, oriented)
+    if not pair_link_counting:
+        yield from results
+        return
+
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) == batch_size:
+            yield from score_batch(batch, links_keys)
+            batch = []
+
+    if len(batch) > 0:
+        yield from score_batch(batch, links_keys)
+
+
+def links_json_key(links_key):
+    if links_key == "causal_links":
+        return links_key
+    return links_key.replace("_causal_links", "_based")
+
+
+class PerformanceAccumulator:
+    def __init__(self, links_keys):
+        self.links_keys = links_keys
+        self.total_counts = {links_key: [0, 0, 0, 0] for links_key in links_keys}
+        self.scene_counts = {links_key: [] for links_key in links_keys}
+        self.scene_names = []
+        self.execution_times = []
+
+    def add(self, counts, execution_time=None, scene_name=None):
+        for links_key in self.links_keys:
+            for j in range(4):
+                self.total_counts[links_key][j] += counts[links_key][j]
+            self.scene_counts[links_key].append(counts[links_key])
+        if execution_time is not None:
+            self.execution_times.append(execution_time)
+        if scene_name is not None:
+            self.scene_names.append(scene_name)
+
+    def metrics(self, links_key):
+        return calculate_metrics(*self.total_counts[links_key])
+
+    # A plain "causal_links" key is reported at the top level as it always has been, while keys such as
+    # "reward_causal_links" are reported under "reward_based" alongside one another. Given a resampler, the metrics of
+    # each set of causal links are reported alongside their confidence intervals and the p-values of paired tests
+    # against every other set of causal links and every compared evaluation, whose scenes are paired by name.
+    def performance_evaluation_json(self, resampler=None, compared_scene_counts=None):
+        if compared_scene_counts is None:
+            compared_scene_counts = {}
+
+        if len(compared_scene_counts) > 0 and len(self.scene_names) != len(self.scene_counts[self.links_keys[0]]):
+            raise ValueError("Comparing against other evaluations requires the name of every scene")
+        compared_scene_counts = {name: paired_scene_counts(self.scene_names, other_scene_names, other_scene_counts)
+                                 for name, (other_scene_names, other_scene_counts) in compared_scene_counts.items()}
+
+        performance_evaluation_json = {}
+        for links_key in self.links_keys:
+            precision, fallout, recall, f1_score = self.metrics(links_key)
+            metrics_json = {
+                "precision": precision,
+                "fallout": fallout,
+                "recall": recall,
+                "f1_score": f1_score
+            }
+
+            if resampler is not None:
+                metrics_json["confidence_intervals"] = resampler.confidence_intervals(self.scene_counts[links_key])
+
+                paired_tests_json = {}
+                for other_links_key in self.links_keys:
+                    if other_links_key != links_key:
+                        paired_tests_json[links_json_key(other_links_key)] = resampler.paired_p_values(
+                            self.scene_counts[links_key], self.scene_counts[other_links_key])
+                for name, other_scene_counts in compared_scene_counts.items():
+                    paired_tests_json[name] = resampler.paired_p_values(self.scene_counts[links_key],
+                                                                        other_scene_counts)
+                if len(paired_tests_json) > 0:
+                    metrics_json["paired_tests"] = paired_tests_json
+
+            if links_key == "causal_links":
+                performance_evaluation_json.update(metrics_json)
+            else:
+                performance_evaluation_json[links_json_key(links_key)] = metrics_json
+
+        if len(self.execution_times) > 0:
+            performance_evaluation_json["execution_time"] = {
+                "mean": statistics.mean(self.execution_times),
+                "stdev": statistics.stdev(self.execution_times)
+            }
+
+        if resampler is not None:
+            performance_evaluation_json["bootstrap"] = resampler.parameters_json()
+
+        return performance_evaluation_json
+
+
+# Evaluates the scenes of the input files under a single key of causal links, writing the evaluation JSON file and,
+# where requested, a performance_detail file in the layout of the other methods' and a named table of the counts of
+# each scene
+def evaluate(input_file_paths, links_key, jobs, output_file_path, detail_output_file_path=None,
+             pair_link_counting=False, resampler=None, compared_scene_counts=None,
+             scene_counts_output_file_path=None):
+    accumulator = PerformanceAccumulator([links_key])
 
-total_tp_count = 0
-total_fp_count = 0
-total_fn_count = 0
-total_tn_count = 0
+    detail_output_file = None
+    if detail_output_file_path is not None:
+        detail_output_file = open(detail_output_file_path, "w")
+        detail_output_file.write(f"# {performance_detail_header}\n")
 
-execution_times = []
+    scene_counts_output_file = None
+    if scene_counts_output_file_path is not None:
+        scene_counts_output_file = open(scene_counts_output_file_path, "w", newline="")
+        scene_counts_csv_writer = csv.writer(scene_counts_output_file)
+        scene_counts_csv_writer.writerow(scene_counts_field_names)
 
-for input_file_path in glob.glob(args.input_path_expr):
-    input_file_basename = os.path.basename(input_file_path)
+    scene_names = []
+    for input_file_path in input_file_paths:
+        scene_names += input_scene_names(input_file_path)
 
-    with open(input_file_path, "r") as input_file:
-        causal_discovery_json = json.load(input_file)
+    try:
+        for scene_name, (ground_truth, counts, execution_time) in zip(
+                scene_names, scored_scene_results(input_file_paths, [links_key], jobs, pair_link_counting,
+                                                  oriented=detail_output_file is not None)):
+            accumulator.add(counts, execution_time, scene_name)
 
-        convoy_head_id = causal_discovery_json["convoy_head_id"]
-        convoy_tail_id = causal_discovery_json["convoy_tail_id"]
-        independent_ids = causal_discovery_json["independent_ids"]
+            scene_counts = counts[links_key]
+            if detail_output_file is not None:
+                detail_output_file.write(format_performance_detail_row(
+                    performance_detail_row(scene_counts, counts[oriented_links_key(links_key)], execution_time)) + "\n")
+            if scene_counts_output_file is not None:
+                scene_counts_csv_writer.writerow([scene_name] + list(scene_counts)
+                                                 + list(calculate_metrics(*scene_counts)) + [execution_time])
+    finally:
+        if detail_output_file is not None:
+            detail_output_file.close()
+        if scene_counts_output_file is not None:
+            scene_counts_output_file.close()
 
-        n = 2 + len(independent_ids)
-        total_possible_links = int((n * (n - 1)) / 2)
+    with open(output_file_path, "w") as output_file:
+        json.dump(accumulator.performance_evaluation_json(resampler, compared_scene_counts), output_file)
 
-        current_causal_links = causal_discovery_json["causal_links"]
 
-        current_tp_count, current_fp_count, current_fn_count, current_tn_count = calculate_scene_performance(current_causal_links, total_possible_links)
+def threshold_directory_names(method_root_path):
+    threshold_names = []
+    for name in os.listdir(method_root_path):
+        if not os.path.isdir(os.path.join(method_root_path, name)):
+            continue
+        try:
+            float(name)
+        except ValueError:
+            continue
+        threshold_names.append(name)
 
-        total_tp_count += current_tp_count
-        total_fp_count += current_fp_count
-        total_fn_count += current_fn_count
-        total_tn_count += current_tn_count
+    return sorted(threshold_names, key=float)
 
-        execution_times.append(causal_discovery_json["time_elapsed_in_microseconds"] / 1.0e6)
 
+# Evaluates every threshold directory of a method and every link type within its scenes in a single pass over one
+# worker pool, writing the {threshold}_evaluation.json file for each threshold into the evaluation output directory
+# alongside a table of the whole sweep. Existing evaluation files, such as the published ones beside the threshold
+# directories, are only replaced when overwriting is requested.
+def evaluate_sweep(method_root_path, jobs, sweep_output_file_path, evaluation_output_directory_path, overwrite=False,
+                   pair_link_counting=False, resampler=None, compared_scene_counts=None):
+    threshold_names = threshold_directory_names(method_root_path)
+    threshold_input_file_paths = {}
+    for threshold_name in threshold_names:
+        threshold_input_file_paths[threshold_name] = scene_shards.directory_input_file_paths(
+            os.path.join(method_root_path, threshold_name))
 
-if total_tp_count + total_fp_count == 0:
-    precision = 0
-else:
-    precision = total_tp_count / (total_tp_count + total_fp_count)
+    threshold_names = [threshold_name for threshold_name in threshold_names
+                       if len(threshold_input_file_paths[threshold_name]) > 0]
+    if len(threshold_names) == 0:
+        raise ValueError(f"No threshold directories containing scenes found under {method_root_path}")
 
-fallout = total_fp_count / (total_fp_count + total_tn_count)
+    evaluation_file_paths = {threshold_name: os.path.join(evaluation_output_directory_path,
+                                                          f"{threshold_name.replace('.', '')}_evaluation.json")
+                             for threshold_name in threshold_names}
+    if not overwrite:
+        existing_file_paths = [evaluation_file_path for evaluation_file_path in evaluation_file_paths.values()
+                               if os.path.exists(evaluation_file_path)]
+        if len(existing_file_paths) > 0:
+            raise ValueError(f"Evaluation files {', '.join(existing_file_paths)} already exist")
 
-recall = total_tp_count / (total_tp_count + total_fn_count)
+    links_keys = find_links_keys(threshold_input_file_paths[threshold_names[0]][0])
 
-f1_score = (2 * total_tp_count) / (2 * total_tp_count + total_fp_count + total_fn_count)
+    input_file_paths = []
+    scene_names = []
+    input_threshold_names = []
+    for threshold_name in threshold_names:
+        for input_file_path in threshold_input_file_paths[threshold_name]:
+            input_file_paths.append(input_file_path)
+            names = input_scene_names(input_file_path)
+            scene_names += names
+            input_threshold_names += [threshold_name] * len(names)
 
-execution_times_mean = statistics.mean(execution_times)
-execution_times_stdev = statistics.stdev(execution_times)
+    accumulators = {threshold_name: PerformanceAccumulator(links_keys) for threshold_name in threshold_names}
 
+    # Each scene recurs under every threshold, so its ground truth is only kept once and checked against every
+    # later occurrence
+    ground_truths = {}
+    results = scored_scene_results(input_file_paths, links_keys, jobs, pair_link_counting)
+    for scene_name, threshold_name, (ground_truth, counts, execution_time) in zip(scene_names, input_threshold_names,
+                                                                                 results):
+        if ground_truths.setdefault(scene_name, ground_truth) != ground_truth:
+            raise ValueError(f"Scene {scene_name} has differing ground truth across thresholds")
+        accumulators[threshold_name].add(counts, execution_time, scene_name)
 
-with open(args.output_file_path, "w") as output_file:
-    performance_evaluation_json = {
-        "precision": precision,
-        "fallout": fallout,
-        "recall": recall,
-        "f1_score": f1_score,
-        "execution_time": {
-            "mean": execution_times_mean,
-            "stdev": execution_times_stdev
-        }
+    with open(sweep_output_file_path, "w") as sweep_output_file:
+        csv_writer = csv.writer(sweep_output_file)
+        csv_writer.writerow(["threshold", "links", "precision", "fallout", "recall", "f1_score",
+                             "execution_time_mean", "execution_time_stdev"])
+
+        for threshold_name in threshold_names:
+            performance_evaluation_json = accumulators[threshold_name].performance_evaluation_json(
+                resampler, compared_scene_counts)
+
+            with open(evaluation_file_paths[threshold_name], "w") as output_file:
+                json.dump(performance_evaluation_json, output_file)
+
+            for links_key in links_keys:
+                csv_writer.writerow([threshold_name, links_key] + list(accumulators[threshold_name].metrics(links_key))
+                                    + [performance_evaluation_json["execution_time"]["mean"],
+                                       performance_evaluation_json["execution_time"]["stdev"]])
+
+
+# Maps the "{agent}.{variable}" node naming of the other methods' graphs onto agent indices, with the convoy head as
+# c0, the convoy tail as c1 and the independent agents as i0 onwards
+def agent_index(node_name):
+    agent_name = node_name.split(".")[0]
+    if agent_name == "c0":
+        return 0
+    elif agent_name == "c1":
+        return 1
+    elif agent_name.startswith("i"):
+        return 2 + int(agent_name[1:])
+    else:
+        raise ValueError(f"Unrecognised graph node name {node_name}")
+
+
+def load_graph_scene(graph_file_path):
+    with open(graph_file_path, "rb") as graph_file:
+        graph = pickle.load(graph_file)
+
+    agent_count = 2
+    for node_name in graph.nodes():
+        agent_count = max(agent_count, agent_index(node_name) + 1)
+
+    edges = np.array([(agent_index(cause), agent_index(effect)) for cause, effect in graph.edges()],
+                     dtype=np.int16).reshape(-1, 2)
+
+    return agent_count, edges
+
+
+# Scores every scene of a graph directory at once from a single stack of adjacency matrices, as the agent indices of
+# the graphs already have the convoy head at 0 and the convoy tail at 1. Returns the adjacent and the oriented TP, FP, FN
+# and TN counts of each scene.
+def evaluate_graph_scenes(graph_scenes):
+    agent_counts = np.array([agent_count for agent_count, edges in graph_scenes], dtype=np.int64)
+    adjacency_stack = np.zeros((len(graph_scenes), max([2] + agent_counts.tolist()), max([2] + agent_counts.tolist())),
+                               dtype=bool)
+    for j, (agent_count, edges) in enumerate(graph_scenes):
+        adjacency_stack[j, edges[:, 0], edges[:, 1]] = True
+
+    total_possible_links = (agent_counts * (agent_counts - 1)) // 2
+
+    adjacent_counts = calculate_confusion_counts(adjacency_stack, total_possible_links).tolist()
+    oriented_counts = calculate_oriented_confusion_counts(adjacency_stack, total_possible_links).tolist()
+
+    return [(tuple(scene_adjacent_counts), tuple(scene_oriented_counts))
+            for scene_adjacent_counts, scene_oriented_counts in zip(adjacent_counts, oriented_counts)]
+
+
+# The metrics of a scene as the performance_detail files of the other methods give them, where the F1 score is taken
+# from the precision and recall
+def performance_detail_metrics(tp_count, fp_count, fn_count, tn_count):
+    precision, fallout, recall, f1_score = calculate_metrics(tp_count, fp_count, fn_count, tn_count)
+    if precision + recall == 0:
+        f1_score = 0.0
+    else:
+        f1_score = 2 * precision * recall / (precision + recall)
+    return precision, fallout, recall, f1_score
+
+
+def graph_directory_scenes(method_root_path):
+    graph_directories = {}
+    for directory_path, directory_names, file_names in os.walk(method_root_path):
+        directory_names.sort()
+        scenes = []
+        for file_name in file_names:
+            match = re.fullmatch(r".+_(\d+)", file_name)
+            if match is not None:
+                scenes.append((int(match.group(1)), os.path.join(directory_path, file_name)))
+        if len(scenes) > 0:
+            graph_directories[os.path.relpath(directory_path, method_root_path)] = sorted(scenes)
+
+    return graph_directories
+
+
+def graph_file_signature(scenes):
+    signature = []
+    for scene_number, graph_file_path in scenes:
+        file_stat = os.stat(graph_file_path)
+        signature.append([os.path.basename(graph_file_path), file_stat.st_size, file_stat.st_mtime_ns])
+    return json.dumps(signature)
+
+
+def graph_cache_file_path(cache_directory_path, graph_directory_path):
+    key = hashlib.sha256(os.path.abspath(graph_directory_path).encode()).hexdigest()
+    return os.path.join(cache_directory_path, f"graphs-{key}.npz")
+
+
+# Converted graphs are kept as one agent count and one block of (cause, effect) agent index pairs per scene, so that
+# later evaluations of the same unchanged directory need not unpickle anything
+def load_graph_cache(cache_file_path, signature):
+    if not os.path.isfile(cache_file_path):
+        return None
+
+    with np.load(cache_file_path) as cache:
+        if cache["signature"].item() != signature:
+            return None
+        agent_counts = cache["agent_counts"].tolist()
+        edge_offsets = cache["edge_offsets"]
+        edges = cache["edges"]
+
+    return [(agent_counts[j], edges[edge_offsets[j]:edge_offsets[j + 1]]) for j in range(len(agent_counts))]
+
+
+def save_graph_cache(cache_file_path, signature, graph_scenes):
+    edge_counts = [len(edges) for agent_count, edges in graph_scenes]
+    arrays = {
+        "signature": np.array(signature, dtype=np.str_),
+        "agent_counts": np.array([agent_count for agent_count, edges in graph_scenes], dtype=np.int16),
+        "edge_offsets": np.concatenate(([0], np.cumsum(edge_counts))).astype(np.int64),
+        "edges": np.concatenate([edges for agent_count, edges in graph_scenes] + [np.empty((0, 2), dtype=np.int16)])
     }
-    json.dump(performance_evaluation_json, output_file)
+
+    temporary_file_path = f"{cache_file_path}.{os.getpid()}.tmp"
+    with open(temporary_file_path, "wb") as cache_file:
+        np.savez(cache_file, **arrays)
+    os.replace(temporary_file_path, cache_file_path)
+
+
+performance_average_labels = ["Other Precision Adjacent", "Other Fallout Adjacent", "Other Recall Adjacent",
+                              "Other F-Score Adjacent", "Other Precision Oriented", "Other Fallout Oriented",
+                              "Other Recall Oriented", "Other F-Score Oriented"]
+
+
+# A row of a performance_detail file, as the adjacent and then the oriented metrics of a scene followed by its
+# computational time
+def performance_detail_row(adjacent_counts, oriented_counts, computational_time):
+    return (list(performance_detail_metrics(*adjacent_counts)) + list(performance_detail_metrics(*oriented_counts))
+            + [computational_time])
+
+
+def format_performance_detail_row(detail_row):
+    return ";".join(f"{float(value):.18e}" for value in detail_row)
+
+
+def write_performance_detail(detail_file_path, detail_rows):
+    with open(detail_file_path, "w") as detail_file:
+        detail_file.write(f"# {performance_detail_header}\n")
+        for detail_row in detail_rows:
+            detail_file.write(format_performance_detail_row(detail_row) + "\n")
+
+
+def write_performance_average(average_file_path, detail_rows, computational_time_line):
+    detail_rows = np.array(detail_rows, dtype=np.float64).reshape(-1, len(performance_average_labels) + 1)
+    with open(average_file_path, "w") as average_file:
+        for j, label in enumerate(performance_average_labels):
+            average_file.write(f"{label}: \n{np.mean(detail_rows[:, j])} +- {np.std(detail_rows[:, j])}\n")
+        average_file.write(f"\n\n{computational_time_line}")
+
+
+# The execution times of the other methods were never written into their graph files, only into their
+# performance_average files, so the computational time of a regenerated average file is taken from the existing one
+def read_computational_time_line(average_file_path):
+    if not os.path.isfile(average_file_path):
+        return None
+    with open(average_file_path, "r") as average_file:
+        for line in average_file:
+            if line.startswith("Computational Time:"):
+                return line.rstrip("\n")
+    return None
+
+
+# The performance files of a graph directory, with the directories of the graphs laid out as
+# graphs/{var}/{max_time_lag}/{p_val} giving performance_detail/{var}/{max_time_lag}/{p_val}.csv,
+# performance_average/{var}/{max_time_lag}/{p_val}.txt and evaluation/{var}/{max_time_lag}/{p_val}.json, and the graphs
+# directory itself giving performance_detail.csv, performance_average.txt and evaluation.json as for the Random method
+def performance_file_paths(directory_path, relative_path):
+    if relative_path == ".":
+        return (os.path.join(directory_path, "performance_detail.csv"),
+                os.path.join(directory_path, "performance_average.txt"),
+                os.path.join(directory_path, "evaluation.json"))
+    return (os.path.join(directory_path, "performance_detail", f"{relative_path}.csv"),
+            os.path.join(directory_path, "performance_average", f"{relative_path}.txt"),
+            os.path.join(directory_path, "evaluation", f"{relative_path}.json"))
+
+
+# Evaluates every directory of pickled graphs beneath the graphs directory of one of the other methods, regenerating
+# the performance_detail and performance_average files of each within the output directory in the layout of the
+# committed ones beside the graphs directory, alongside a table of the whole sweep. Given a resampler, the evaluation
+# JSON file of each is written to evaluation/{var}/{max_time_lag}/{p_val}.json as well.
+def evaluate_graphs(method_root_path, jobs, output_directory_path, cache_directory_path=None, overwrite=False,
+                    resampler=None, compared_scene_counts=None):
+    graph_directories = graph_directory_scenes(method_root_path)
+    if len(graph_directories) == 0:
+        raise ValueError(f"No graph files found under {method_root_path}")
+
+    output_file_paths = {}
+    for relative_path in graph_directories.keys():
+        output_file_paths[relative_path] = performance_file_paths(output_directory_path, relative_path)
+        if resampler is None:
+            output_file_paths[relative_path] = output_file_paths[relative_path][:2]
+    if not overwrite:
+        existing_file_paths = [output_file_path for file_paths in output_file_paths.values()
+                               for output_file_path in file_paths if os.path.exists(output_file_path)]
+        if len(existing_file_paths) > 0:
+            raise ValueError(f"{len(existing_file_paths)} performance files already exist within "
+                             f"{output_directory_path}, such as {existing_file_paths[0]}")
+
+    graph_scenes = {}
+    signatures = {}
+    uncached_graph_file_paths = []
+    for relative_path, scenes in graph_directories.items():
+        if cache_directory_path is not None:
+            signatures[relative_path] = graph_file_signature(scenes)
+            graph_scenes[relative_path] = load_graph_cache(
+                graph_cache_file_path(cache_directory_path, os.path.join(method_root_path, relative_path)),
+                signatures[relative_path])
+        if graph_scenes.get(relative_path) is None:
+            uncached_graph_file_paths += [graph_file_path for scene_number, graph_file_path in scenes]
+
+    if jobs == 1:
+        loaded_graph_scenes = list(map(load_graph_scene, uncached_graph_file_paths))
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            loaded_graph_scenes = pool.map(load_graph_scene, uncached_graph_file_paths,
+                                           chunksize=max(1, len(uncached_graph_file_paths) // (jobs * 8)))
+
+    loaded_graph_scenes = dict(zip(uncached_graph_file_paths, loaded_graph_scenes))
+    for relative_path, scenes in graph_directories.items():
+        if graph_scenes.get(relative_path) is None:
+            graph_scenes[relative_path] = [loaded_graph_scenes[graph_file_path]
+                                           for scene_number, graph_file_path in scenes]
+            if cache_directory_path is not None:
+                save_graph_cache(
+                    graph_cache_file_path(cache_directory_path, os.path.join(method_root_path, relative_path)),
+                    signatures[relative_path], graph_scenes[relative_path])
+
+    with open(os.path.join(output_directory_path, "sweep.csv"), "w") as sweep_output_file:
+        csv_writer = csv.writer(sweep_output_file)
+        csv_writer.writerow(["graphs", "precision", "fallout", "recall", "f1_score"])
+
+        for relative_path in sorted(graph_directories.keys()):
+            accumulator = PerformanceAccumulator(["causal_links"])
+
+            detail_rows = []
+            for (scene_number, graph_file_path), (adjacent_counts, oriented_counts) in zip(
+                    graph_directories[relative_path], evaluate_graph_scenes(graph_scenes[relative_path])):
+                accumulator.add({"causal_links": adjacent_counts}, scene_name=os.path.basename(graph_file_path))
+                # Execution times are not recorded within the graph files
+                detail_rows.append(performance_detail_row(adjacent_counts, oriented_counts, -1))
+
+            detail_file_path, average_file_path = output_file_paths[relative_path][:2]
+            computational_time_line = read_computational_time_line(
+                performance_file_paths(os.path.dirname(os.path.abspath(method_root_path)), relative_path)[1])
+            if computational_time_line is None:
+                computational_time_line = f"Computational Time: {np.mean([-1.0])} +- {np.std([-1.0])}"
+
+            for output_file_path in output_file_paths[relative_path]:
+                os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+            write_performance_detail(detail_file_path, detail_rows)
+            write_performance_average(average_file_path, detail_rows, computational_time_line)
+
+            if resampler is not None:
+                with open(output_file_paths[relative_path][2], "w") as output_file:
+                    json.dump(accumulator.performance_evaluation_json(resampler, compared_scene_counts), output_file)
+
+            csv_writer.writerow([relative_path] + list(accumulator.metrics("causal_links")))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("input_path_expr")
+    arg_parser.add_argument("output_file_path")
+    arg_parser.add_argument("--detail-output-file-path")
+    arg_parser.add_argument("--scene-counts-output-file-path")
+    arg_parser.add_argument("--links-key", default="causal_links")
+    arg_parser.add_argument("--sweep", action="store_true")
+    arg_parser.add_argument("--evaluation-output-directory-path")
+    arg_parser.add_argument("--overwrite", action="store_true")
+    arg_parser.add_argument("--graphs", action="store_true")
+    arg_parser.add_argument("--cache-directory-path")
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    arg_parser.add_argument("--pair-link-counting", action="store_true")
+    arg_parser.add_argument("--bootstrap-resamples", type=int, default=0)
+    arg_parser.add_argument("--confidence-level", type=float, default=0.95)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--compare-scene-counts-file-path", action="append", default=[])
+    args = arg_parser.parse_args()
+
+    if args.jobs < 1:
+        raise ValueError(f"Number of jobs {args.jobs} must be at least 1")
+
+    if args.cache_directory_path is not None and not os.path.isdir(args.cache_directory_path):
+        raise ValueError(f"Cache directory path {args.cache_directory_path} is not a valid directory")
+
+    if args.bootstrap_resamples < 0:
+        raise ValueError(f"Number of bootstrap resamples {args.bootstrap_resamples} must not be negative")
+
+    if len(args.compare_scene_counts_file_path) > 0 and args.bootstrap_resamples == 0:
+        raise ValueError("Comparing against other scene counts files requires a number of bootstrap resamples")
+
+    compared_scene_counts = {}
+    for scene_counts_file_path in args.compare_scene_counts_file_path:
+        if not os.path.isfile(scene_counts_file_path):
+            raise ValueError(f"Scene counts file path {scene_counts_file_path} is not a valid file")
+        compared_scene_counts[scene_counts_file_path] = read_scene_counts(scene_counts_file_path)
+
+    resampler = None
+    if args.bootstrap_resamples > 0:
+        resampler = Resampler(args.bootstrap_resamples, args.confidence_level, args.seed, args.jobs)
+
+    try:
+        run(args, resampler, compared_scene_counts)
+    finally:
+        if resampler is not None:
+            resampler.close()
+
+
+def run(args, resampler, compared_scene_counts):
+    if args.graphs:
+        if not os.path.isdir(args.input_path_expr):
+            raise ValueError(f"Graphs root path {args.input_path_expr} is not a valid directory")
+
+        if not os.path.isdir(args.output_file_path):
+            raise ValueError(f"Output directory path {args.output_file_path} is not a valid directory")
+
+        evaluate_graphs(args.input_path_expr, args.jobs, args.output_file_path, args.cache_directory_path,
+                        args.overwrite, resampler, compared_scene_counts)
+    elif args.sweep:
+        if not os.path.isdir(args.input_path_expr):
+            raise ValueError(f"Method root path {args.input_path_expr} is not a valid directory")
+
+        evaluation_output_directory_path = args.evaluation_output_directory_path
+        if evaluation_output_directory_path is None:
+            evaluation_output_directory_path = os.path.dirname(os.path.abspath(args.output_file_path))
+        if not os.path.isdir(evaluation_output_directory_path):
+            raise ValueError(f"Evaluation output directory path {evaluation_output_directory_path} is not a valid "
+                             f"directory")
+
+        evaluate_sweep(args.input_path_expr, args.jobs, args.output_file_path, evaluation_output_directory_path,
+                       args.overwrite, args.pair_link_counting, resampler, compared_scene_counts)
+    else:
+        evaluate(sorted(glob.glob(args.input_path_expr)), args.links_key, args.jobs, args.output_file_path,
+                 args.detail_output_file_path, args.pair_link_counting, resampler, compared_scene_counts,
+                 args.scene_counts_output_file_path)
+
+
+if __name__ == "__main__":
+    main()
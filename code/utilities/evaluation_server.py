@@ -0,0 +1,326 @@
+#!/usr/bin/python3
+
+import argparse
+import functools
+import glob
+import http.server
+import json
+import multiprocessing
+import os
+import socketserver
+import stat
+import threading
+import time
+import urllib.parse
+
+import evaluate_performance
+import scene_shards
+from performance_statistics import Resampler
+
+
+# Reads a scene file or a shard of scenes and scores every set of causal links within each scene, returning the ground
+# truth, the TP, FP, FN and TN counts of each set of causal links and the execution time of each scene, or None where
+# the file cannot be read, as when it is still being written
+def load_scenes(input_file_path, pair_link_counting=False):
+    try:
+        if scene_shards.is_shard_file_path(input_file_path):
+            causal_discovery_jsons = scene_shards.SceneShard(input_file_path).scenes()
+        else:
+            with open(input_file_path, "rb") as input_file:
+                causal_discovery_jsons = [scene_shards.loads(input_file.read())]
+
+        results = []
+        for causal_discovery_json in causal_discovery_jsons:
+            links_keys = evaluate_performance.json_links_keys(causal_discovery_json)
+            result = evaluate_performance.evaluate_scene_json(causal_discovery_json, links_keys, pair_link_counting)
+            if pair_link_counting:
+                result = evaluate_performance.score_batch([result], links_keys)[0]
+            results.append(result)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    return results
+
+
+# A file is read again whenever its modification time or size changes, or for a shard, those of its index
+def file_signature(input_file_path):
+    file_stat = os.stat(input_file_path)
+    signature = (file_stat.st_mtime_ns, file_stat.st_size)
+    if scene_shards.is_shard_file_path(input_file_path):
+        index_file_stat = os.stat(scene_shards.index_file_path(input_file_path))
+        signature += (index_file_stat.st_mtime_ns, index_file_stat.st_size)
+    return signature
+
+
+# Keeps the counts of the scenes of every scene file and shard it has read, keyed by the file's absolute path and
+# invalidated whenever the modification time or size of the file changes, so that each query only reads the files that
+# are new or have changed since they were last read. Files that could not be read are remembered in the same way until
+# they change.
+class EvaluationService:
+    def __init__(self, jobs=1, pair_link_counting=False, resampler=None):
+        self.jobs = jobs
+        self.pair_link_counting = pair_link_counting
+        self.resampler = resampler
+        self.scenes = {}
+        self.lock = threading.Lock()
+        self.pool = None
+        self.read_count = 0
+        self.watched_paths = []
+        self.watch_errors = {}
+        self.last_refresh_time = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    # The worker pool is only started once it is first needed
+    def map(self, function, arguments):
+        if self.jobs == 1 or len(arguments) < 2:
+            return list(map(function, arguments))
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.jobs)
+        return self.pool.map(function, arguments, chunksize=max(1, len(arguments) // (self.jobs * 8)))
+
+    # Reads any of the files that are new or have changed, returning the path and counts of each scene of the readable
+    # files in the given order alongside the paths of any files that could not be read
+    def refresh(self, input_file_paths):
+        input_file_paths = [os.path.abspath(input_file_path) for input_file_path in input_file_paths]
+
+        with self.lock:
+            signatures = {}
+            stale_file_paths = []
+            for input_file_path in input_file_paths:
+                try:
+                    signatures[input_file_path] = file_signature(input_file_path)
+                except FileNotFoundError:
+                    self.scenes.pop(input_file_path, None)
+                    continue
+
+                scene = self.scenes.get(input_file_path)
+                if scene is None or scene[0] != signatures[input_file_path]:
+                    stale_file_paths.append(input_file_path)
+
+            load_scenes_function = functools.partial(load_scenes, pair_link_counting=self.pair_link_counting)
+            for input_file_path, results in zip(stale_file_paths, self.map(load_scenes_function, stale_file_paths)):
+                self.scenes[input_file_path] = (signatures[input_file_path], results)
+            self.read_count += len(stale_file_paths)
+
+            scenes = []
+            unreadable_file_paths = []
+            for input_file_path in input_file_paths:
+                if input_file_path not in signatures:
+                    continue
+                results = self.scenes[input_file_path][1]
+                if results is None:
+                    unreadable_file_paths.append(input_file_path)
+                else:
+                    scenes += [(input_file_path, result) for result in results]
+
+        return scenes, unreadable_file_paths
+
+    def evaluation_json(self, scenes, links_keys):
+        accumulator = evaluate_performance.PerformanceAccumulator(links_keys)
+        for input_file_path, (ground_truth, counts, execution_time) in scenes:
+            for links_key in links_keys:
+                if links_key not in counts:
+                    raise ValueError(f"A scene of {input_file_path} has no {links_key}")
+            accumulator.add(counts, execution_time)
+        return accumulator.performance_evaluation_json(self.resampler)
+
+    # The evaluation of the scene files matching a path expression, as evaluate_performance.py would write it
+    def metrics_json(self, input_path_expr, links_key):
+        scenes, unreadable_file_paths = self.refresh(sorted(glob.glob(input_path_expr)))
+        if len(scenes) == 0:
+            raise ValueError(f"No readable scenes match {input_path_expr}")
+
+        return {
+            "scenes": len(scenes),
+            "unreadable": unreadable_file_paths,
+            "evaluation": self.evaluation_json(scenes, [links_key])
+        }
+
+    # The evaluation of every threshold directory of a method and every set of causal links within its scenes, as
+    # evaluate_performance.py would write it to each {threshold}_evaluation.json file of a sweep
+    def sweep_json(self, method_root_path):
+        thresholds_json = {}
+        all_unreadable_file_paths = []
+        for threshold_name in evaluate_performance.threshold_directory_names(method_root_path):
+            scenes, unreadable_file_paths = self.refresh(scene_shards.directory_input_file_paths(
+                os.path.join(method_root_path, threshold_name)))
+            all_unreadable_file_paths += unreadable_file_paths
+            if len(scenes) == 0:
+                continue
+
+            links_keys = list(scenes[0][1][1].keys())
+            thresholds_json[threshold_name] = {
+                "scenes": len(scenes),
+                "evaluation": self.evaluation_json(scenes, links_keys)
+            }
+
+        if len(thresholds_json) == 0:
+            raise ValueError(f"No threshold directories containing scenes found under {method_root_path}")
+
+        return {
+            "thresholds": thresholds_json,
+            "unreadable": all_unreadable_file_paths
+        }
+
+    def status_json(self):
+        with self.lock:
+            return {
+                "cached_scenes": sum(len(results) for signature, results in self.scenes.values() if results is not None),
+                "read_files": self.read_count,
+                "watched": self.watched_paths,
+                "last_refresh_time": self.last_refresh_time,
+                "watch_errors": self.watch_errors,
+                "pair_link_counting": self.pair_link_counting,
+                "bootstrap": None if self.resampler is None else self.resampler.parameters_json()
+            }
+
+    # Reads the scene files of every threshold directory of the watched methods as they arrive, so that queries about
+    # them only ever find the files written since the last refresh to be new. A method that cannot be read, as when a
+    # file is removed while it is being listed or a shard is stale, is reported and tried again at the next refresh.
+    def watch(self, method_root_paths, interval, stop_event):
+        while True:
+            watch_errors = {}
+            for method_root_path in method_root_paths:
+                try:
+                    input_file_paths = []
+                    for threshold_name in evaluate_performance.threshold_directory_names(method_root_path):
+                        input_file_paths += scene_shards.directory_input_file_paths(os.path.join(method_root_path,
+                                                                                                 threshold_name))
+                    self.refresh(input_file_paths)
+                except (OSError, ValueError) as error:
+                    watch_errors[method_root_path] = str(error)
+                    if self.watch_errors.get(method_root_path) != str(error):
+                        print(f"Could not refresh {method_root_path}: {error}")
+            self.watch_errors = watch_errors
+            self.last_refresh_time = time.time()
+
+            if stop_event.wait(interval):
+                return
+
+
+class EvaluationRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        service = self.server.evaluation_service
+
+        start_time = time.perf_counter()
+        try:
+            if url.path == "/metrics":
+                if "glob" not in query:
+                    raise ValueError("Querying metrics requires a glob")
+                response_json = service.metrics_json(query["glob"], query.get("links_key", "causal_links"))
+            elif url.path == "/sweep":
+                if "root" not in query or not os.path.isdir(query["root"]):
+                    raise ValueError(f"Method root path {query.get('root')} is not a valid directory")
+                response_json = service.sweep_json(query["root"])
+            elif url.path == "/status":
+                response_json = service.status_json()
+            else:
+                self.send_json(404, {"error": f"Unknown path {url.path}"})
+                return
+        except ValueError as error:
+            self.send_json(400, {"error": str(error)})
+            return
+
+        response_json["seconds"] = time.perf_counter() - start_time
+        self.send_json(200, response_json)
+
+    def send_json(self, status, response_json):
+        body = json.dumps(response_json).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Clients of a Unix socket have no address
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    pass
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serves evaluations of causal discovery output from an in-memory "
+                                                     "cache of scored scenes")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix-socket-path")
+    arg_parser.add_argument("--watch-directory-path", action="append", default=[])
+    arg_parser.add_argument("--watch-interval", type=float, default=2.0)
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    arg_parser.add_argument("--pair-link-counting", action="store_true")
+    arg_parser.add_argument("--bootstrap-resamples", type=int, default=0)
+    arg_parser.add_argument("--confidence-level", type=float, default=0.95)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if args.jobs < 1:
+        raise ValueError(f"Number of jobs {args.jobs} must be at least 1")
+
+    if args.watch_interval <= 0:
+        raise ValueError(f"Watch interval {args.watch_interval} must be positive")
+
+    for watch_directory_path in args.watch_directory_path:
+        if not os.path.isdir(watch_directory_path):
+            raise ValueError(f"Watch directory path {watch_directory_path} is not a valid directory")
+
+    if args.bootstrap_resamples < 0:
+        raise ValueError(f"Number of bootstrap resamples {args.bootstrap_resamples} must not be negative")
+
+    # Only a socket left behind by an earlier server is removed, never any other kind of file
+    if args.unix_socket_path is not None and os.path.exists(args.unix_socket_path):
+        if not stat.S_ISSOCK(os.stat(args.unix_socket_path).st_mode):
+            raise ValueError(f"Unix socket path {args.unix_socket_path} exists and is not a socket")
+        os.remove(args.unix_socket_path)
+
+    resampler = None
+    if args.bootstrap_resamples > 0:
+        resampler = Resampler(args.bootstrap_resamples, args.confidence_level, args.seed, args.jobs)
+
+    service = EvaluationService(args.jobs, args.pair_link_counting, resampler)
+    service.watched_paths = [os.path.abspath(path) for path in args.watch_directory_path]
+
+    if args.unix_socket_path is not None:
+        server = UnixHTTPServer(args.unix_socket_path, EvaluationRequestHandler)
+        address = args.unix_socket_path
+    else:
+        server = http.server.HTTPServer((args.host, args.port), EvaluationRequestHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    server.evaluation_service = service
+
+    stop_event = threading.Event()
+    watch_thread = None
+    if len(service.watched_paths) > 0:
+        watch_thread = threading.Thread(target=service.watch, args=(service.watched_paths, args.watch_interval,
+                                                                    stop_event), daemon=True)
+        watch_thread.start()
+
+    print(f"Serving evaluations on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if watch_thread is not None:
+            watch_thread.join()
+        server.server_close()
+        service.close()
+        if resampler is not None:
+            resampler.close()
+        if args.unix_socket_path is not None:
+            os.remove(args.unix_socket_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+
+
+# Bumped whenever a change to the extraction logic means that previously generated output is no longer current
+cache_version = 1
+
+
+def file_digest(file_path, file_entry):
+    file_stat = os.stat(file_path)
+    if (file_entry is not None and file_entry["size"] == file_stat.st_size
+            and file_entry["mtime_ns"] == file_stat.st_mtime_ns):
+        return file_entry
+
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b""):
+            file_hash.update(chunk)
+
+    return {
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "sha256": file_hash.hexdigest()
+    }
+
+
+def parameters_digest(parameters):
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+
+def tracks_cache_file_path(tracks_directory_path, tracks_file_entry, columns):
+    key = parameters_digest({"sha256": tracks_file_entry["sha256"], "columns": columns})
+    return os.path.join(tracks_directory_path, f"{key}.npz")
+
+
+class ExtractionCache:
+    def __init__(self, cache_directory_path):
+        self.manifest_file_path = os.path.join(cache_directory_path, "manifest.json")
+        self.tracks_directory_path = os.path.join(cache_directory_path, "tracks")
+        os.makedirs(self.tracks_directory_path, exist_ok=True)
+
+        self.manifest = None
+        if os.path.isfile(self.manifest_file_path):
+            with open(self.manifest_file_path, "r") as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+        if self.manifest is None or self.manifest.get("version") != cache_version:
+            self.manifest = {
+                "version": cache_version,
+                "files": {},
+                "recordings": {}
+            }
+
+    def recording_cache_entries(self, recording_key, input_file_paths):
+        file_entries = {file_path: self.manifest["files"].get(file_path) for file_path in input_file_paths}
+        return file_entries, self.manifest["recordings"].get(recording_key), self.tracks_directory_path
+
+    def update(self, recording_key, cache_entries):
+        file_entries, recording_entry = cache_entries
+        self.manifest["files"].update(file_entries)
+        self.manifest["recordings"][recording_key] = recording_entry
+
+    def save(self):
+        temporary_file_path = f"{self.manifest_file_path}.tmp"
+        with open(temporary_file_path, "w") as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(temporary_file_path, self.manifest_file_path)
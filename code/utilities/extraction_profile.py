@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import time
+
+
+stage_fields = ["seconds", "calls", "rows", "bytes"]
+
+
+class StageTimer:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stage["seconds"] += time.perf_counter() - self.start_time
+        self.stage["calls"] += 1
+
+
+# Accumulates the time spent in each stage of the extraction of one recording, alongside the rows processed and the
+# bytes written by each stage
+class RecordingProfile:
+    def __init__(self, recording_id):
+        self.recording_id = recording_id
+        self.stages = {}
+        self.skipped = False
+        self.start_time = time.perf_counter()
+        self.seconds = None
+
+    def stage_entry(self, stage_name):
+        stage = self.stages.get(stage_name)
+        if stage is None:
+            stage = self.stages[stage_name] = dict.fromkeys(stage_fields, 0)
+        return stage
+
+    def stage(self, stage_name, rows=0):
+        stage = self.stage_entry(stage_name)
+        stage["rows"] += rows
+        return StageTimer(stage)
+
+    def add_rows(self, stage_name, rows):
+        self.stage_entry(stage_name)["rows"] += rows
+
+    def add_output(self, stage_name, output_file_path):
+        self.stage_entry(stage_name)["bytes"] += os.path.getsize(output_file_path)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start_time
+
+    def as_json(self):
+        return {
+            "recording": self.recording_id,
+            "skipped": self.skipped,
+            "seconds": self.seconds,
+            "stages": self.stages
+        }
+
+
+class NullStageTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+# Stands in for a RecordingProfile when profiling is disabled, so that every instrumented stage costs one method call
+class NullProfile:
+    timer = NullStageTimer()
+
+    # The null profile is shared by every recording, so marking it as skipped leaves it unchanged
+    @property
+    def skipped(self):
+        return False
+
+    @skipped.setter
+    def skipped(self, skipped):
+        pass
+
+    def stage(self, stage_name, rows=0):
+        return self.timer
+
+    def add_rows(self, stage_name, rows):
+        pass
+
+    def add_output(self, stage_name, output_file_path):
+        pass
+
+    def finish(self):
+        pass
+
+    def as_json(self):
+        return None
+
+
+null_profile = NullProfile()
+
+
+def total_stages(recording_profiles):
+    stages = {}
+    for recording_profile in recording_profiles:
+        for stage_name, stage in recording_profile["stages"].items():
+            total_stage = stages.setdefault(stage_name, dict.fromkeys(stage_fields, 0))
+            for field in stage_fields:
+                total_stage[field] += stage[field]
+    return stages
+
+
+# Writes the report as CSV with one row per recording and stage, followed by the totals of each stage under the
+# recording "all", where the output file path ends in .csv and as JSON otherwise
+def write_report(output_file_path, recording_profiles, seconds, jobs):
+    stages = total_stages(recording_profiles)
+
+    if output_file_path.endswith(".csv"):
+        with open(output_file_path, "w") as output_file:
+            csv_writer = csv.writer(output_file)
+            csv_writer.writerow(["recording", "stage"] + stage_fields)
+            for recording_profile in recording_profiles:
+                csv_writer.writerow([recording_profile["recording"], "total", recording_profile["seconds"], 1, 0, 0])
+                for stage_name, stage in recording_profile["stages"].items():
+                    csv_writer.writerow([recording_profile["recording"], stage_name]
+                                        + [stage[field] for field in stage_fields])
+            csv_writer.writerow(["all", "total", seconds, len(recording_profiles), 0, 0])
+            for stage_name, stage in stages.items():
+                csv_writer.writerow(["all", stage_name] + [stage[field] for field in stage_fields])
+    else:
+        with open(output_file_path, "w") as output_file:
+            json.dump({
+                "seconds": seconds,
+                "jobs": jobs,
+                "stages": stages,
+                "recordings": recording_profiles
+            }, output_file, indent=4)
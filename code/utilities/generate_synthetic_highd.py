@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+
+import argparse
+import csv
+import os
+import numpy as np
+
+recording_meta_field_names = ["id", "frameRate", "locationId", "speedLimit", "month", "weekDay", "startTime", "duration",
+                              "totalDrivenDistance", "totalDrivenTime", "numVehicles", "numCars", "numTrucks",
+                              "upperLaneMarkings", "lowerLaneMarkings"]
+
+tracks_meta_field_names = ["id", "width", "height", "initialFrame", "finalFrame", "numFrames", "class",
+                           "drivingDirection", "traveledDistance", "minXVelocity", "maxXVelocity", "meanXVelocity",
+                           "minDHW", "minTHW", "minTTC", "numLaneChanges"]
+
+tracks_field_names = ["frame", "id", "x", "y", "width", "height", "xVelocity", "yVelocity", "xAcceleration",
+                      "yAcceleration", "frontSightDistance", "backSightDistance", "dhw", "thw", "ttc",
+                      "precedingXVelocity", "precedingId", "followingId", "leftPrecedingId", "leftAlongsideId",
+                      "leftFollowingId", "rightPrecedingId", "rightAlongsideId", "rightFollowingId", "laneId"]
+
+id_field_names = {"frame", "id", "precedingId", "followingId", "leftPrecedingId", "leftAlongsideId", "leftFollowingId",
+                  "rightPrecedingId", "rightAlongsideId", "rightFollowingId", "laneId"}
+
+lane_width = 3.75
+road_length = 420.0
+
+
+def lane_ids(lane_count):
+    return list(range(2, 2 + lane_count))
+
+
+# Lanes in the upper half of the road are driven from right to left, as in highD
+def driving_direction(lane_id, lane_count):
+    return 1 if lane_id < 2 + lane_count // 2 else 2
+
+
+def lane_markings(lane_ids):
+    return ";".join(f"{(lane_id - 1.5) * lane_width:.2f}" for lane_id in lane_ids + [lane_ids[-1] + 1])
+
+
+# Velocities vary sinusoidally about their base velocity by the given relative amplitude
+def velocity_profile(rng, frame_count, frame_rate, base_velocity, amplitude):
+    period = rng.uniform(8.0, 20.0) * frame_rate
+    phase = rng.uniform(0.0, 2 * np.pi)
+    t = np.arange(frame_count)
+    return base_velocity * (1.0 + amplitude * np.sin(2 * np.pi * t / period + phase))
+
+
+def track_frame_count(rng, frame_count, frame_rate):
+    minimum_frame_count = min(frame_count, int(12 * frame_rate))
+    maximum_frame_count = min(frame_count, int(40 * frame_rate))
+    return int(rng.integers(minimum_frame_count, maximum_frame_count + 1))
+
+
+def plant_convoy(rng, args):
+    frame_count = track_frame_count(rng, args.frames, args.frame_rate)
+    initial_frame = int(rng.integers(1, args.frames - frame_count + 2))
+    lane_id = int(rng.choice(lane_ids(args.lanes)))
+    velocities = velocity_profile(rng, frame_count, args.frame_rate, rng.uniform(20.0, 35.0), rng.uniform(0.15, 0.3))
+
+    # The tail of the convoy joins shortly after the head and keeps within the maximum convoy distance headway of it
+    offset = int(rng.integers(0, int(args.frame_rate) + 1))
+    headways = rng.uniform(5.0, 7.0) + 1.5 * np.sin(np.arange(frame_count - offset) / (3 * args.frame_rate))
+
+    head = {
+        "lane_id": lane_id,
+        "initial_frame": initial_frame,
+        "velocities": velocities,
+        "x0": rng.uniform(0.0, 50.0)
+    }
+    tail = {
+        "lane_id": lane_id,
+        "initial_frame": initial_frame + offset,
+        "velocities": velocities[offset:],
+        "dhw": headways
+    }
+    head["following"] = tail
+    tail["preceding"] = head
+
+    return [head, tail]
+
+
+def background_track(rng, args):
+    frame_count = track_frame_count(rng, args.frames, args.frame_rate)
+    track = {
+        "lane_id": int(rng.choice(lane_ids(args.lanes))),
+        "initial_frame": int(rng.integers(1, args.frames - frame_count + 2)),
+        "velocities": velocity_profile(rng, frame_count, args.frame_rate, rng.uniform(20.0, 35.0),
+                                       rng.uniform(0.0, 0.15)),
+        "x0": rng.uniform(0.0, 50.0)
+    }
+
+    if args.lanes > 1 and rng.random() < 0.1:
+        lane_id = track["lane_id"] + (1 if track["lane_id"] < 1 + args.lanes else -1)
+        if driving_direction(lane_id, args.lanes) == driving_direction(track["lane_id"], args.lanes):
+            track["lane_change"] = (frame_count // 2, lane_id)
+
+    return track
+
+
+def track_columns(track, args):
+    frame_count = len(track["velocities"])
+    direction = driving_direction(track["lane_id"], args.lanes)
+    sign = 1.0 if direction == 2 else -1.0
+
+    velocities = track["velocities"]
+    if "preceding" in track:
+        preceding = track["preceding"]
+        offset = track["initial_frame"] - preceding["initial_frame"]
+        x = preceding["x"][offset:offset + frame_count] - sign * (track["dhw"] + preceding["width"])
+    else:
+        x = track["x0"] + np.concatenate(([0.0], np.cumsum(velocities[:-1]) / args.frame_rate))
+        if direction == 1:
+            x = road_length - x
+    track["x"] = x
+
+    lane = np.full(frame_count, track["lane_id"], dtype=np.int64)
+    if "lane_change" in track:
+        lane[track["lane_change"][0]:] = track["lane_change"][1]
+
+    dhw = track.get("dhw", np.zeros(frame_count))
+    columns = {
+        "frame": np.arange(track["initial_frame"], track["initial_frame"] + frame_count),
+        "id": np.full(frame_count, track["id"]),
+        "x": x,
+        "y": lane * lane_width + track["y_offset"],
+        "width": np.full(frame_count, track["width"]),
+        "height": np.full(frame_count, track["height"]),
+        "xVelocity": sign * velocities,
+        "yVelocity": np.zeros(frame_count),
+        "xAcceleration": sign * np.gradient(velocities) * args.frame_rate if frame_count > 1 else np.zeros(frame_count),
+        "yAcceleration": np.zeros(frame_count),
+        "frontSightDistance": np.abs((road_length if direction == 2 else 0.0) - x),
+        "backSightDistance": np.abs((0.0 if direction == 2 else road_length) - x),
+        "dhw": dhw,
+        "thw": dhw / velocities,
+        "ttc": np.zeros(frame_count),
+        "precedingXVelocity": np.zeros(frame_count),
+        "precedingId": np.zeros(frame_count),
+        "followingId": np.zeros(frame_count),
+        "laneId": lane
+    }
+    if "preceding" in track:
+        preceding = track["preceding"]
+        columns["precedingXVelocity"] = sign * preceding["velocities"][offset:offset + frame_count]
+        columns["precedingId"] = np.full(frame_count, preceding["id"])
+    if "following" in track:
+        following = track["following"]
+        # The tail only joins the head from its own initial frame onwards
+        columns["followingId"][following["initial_frame"] - track["initial_frame"]:] = following["id"]
+
+    for field_name in tracks_field_names:
+        columns.setdefault(field_name, np.zeros(frame_count))
+
+    return columns
+
+
+def track_meta_row(track, columns, args):
+    velocities = columns["xVelocity"]
+    dhw = columns["dhw"]
+    valid_dhw = dhw[dhw > 0]
+    valid_thw = columns["thw"][dhw > 0]
+    return [
+        track["id"],
+        f"{track['width']:.2f}",
+        f"{track['height']:.2f}",
+        track["initial_frame"],
+        track["initial_frame"] + len(velocities) - 1,
+        len(velocities),
+        track["class"],
+        driving_direction(track["lane_id"], args.lanes),
+        f"{abs(columns['x'][-1] - columns['x'][0]):.2f}",
+        f"{np.min(velocities):.2f}",
+        f"{np.max(velocities):.2f}",
+        f"{np.mean(velocities):.2f}",
+        f"{np.min(valid_dhw):.2f}" if len(valid_dhw) > 0 else "-1.00",
+        f"{np.min(valid_thw):.2f}" if len(valid_thw) > 0 else "-1.00",
+        "-1.00",
+        1 if "lane_change" in track else 0
+    ]
+
+
+# Generates one recording of background traffic alongside the given number of planted convoys, each of which is a
+# pair of tracks that the extraction accepts as a convoy head and tail. Returns the number of rows of the tracks file.
+def generate_recording(i, args, rng):
+    convoy_count = min(args.convoys, args.tracks // 2)
+    tracks = []
+    for j in range(convoy_count):
+        tracks += plant_convoy(rng, args)
+    while len(tracks) < args.tracks:
+        tracks.append(background_track(rng, args))
+
+    # Track ids are assigned in order of appearance, as they are in highD
+    tracks.sort(key=lambda track: track["initial_frame"])
+    for track_id, track in enumerate(tracks, start=1):
+        track["id"] = track_id
+        track["class"] = "Truck" if rng.random() < 0.2 else "Car"
+        track["width"] = rng.uniform(15.0, 18.0) if track["class"] == "Truck" else rng.uniform(4.0, 5.0)
+        track["height"] = rng.uniform(2.4, 2.6) if track["class"] == "Truck" else rng.uniform(1.8, 2.0)
+        track["y_offset"] = rng.uniform(-0.2, 0.2)
+
+    # Convoy heads are laid out before their tails, as the tails are positioned relative to them
+    columns_by_track = {}
+    for track in sorted(tracks, key=lambda track: "preceding" in track):
+        columns_by_track[track["id"]] = track_columns(track, args)
+
+    lanes = lane_ids(args.lanes)
+    upper_lanes = [lane_id for lane_id in lanes if driving_direction(lane_id, args.lanes) == 1]
+    lower_lanes = [lane_id for lane_id in lanes if driving_direction(lane_id, args.lanes) == 2]
+    truck_count = sum(1 for track in tracks if track["class"] == "Truck")
+
+    track_meta_rows = [track_meta_row(track, columns_by_track[track["id"]], args) for track in tracks]
+
+    with open(os.path.join(args.output_directory_path, f"{i}_recordingMeta.csv"), "w", newline="") as output_file:
+        csv_writer = csv.writer(output_file)
+        csv_writer.writerow(recording_meta_field_names)
+        csv_writer.writerow([i, int(args.frame_rate), 1, "-1.00", 9, "Tue", "08:38", f"{args.frames / args.frame_rate:.2f}",
+                             f"{sum(float(row[8]) for row in track_meta_rows):.2f}",
+                             f"{sum(row[5] for row in track_meta_rows) / args.frame_rate:.2f}",
+                             len(tracks), len(tracks) - truck_count, truck_count,
+                             lane_markings(upper_lanes) if len(upper_lanes) > 0 else "",
+                             lane_markings(lower_lanes) if len(lower_lanes) > 0 else ""])
+
+    with open(os.path.join(args.output_directory_path, f"{i}_tracksMeta.csv"), "w", newline="") as output_file:
+        csv_writer = csv.writer(output_file)
+        csv_writer.writerow(tracks_meta_field_names)
+        csv_writer.writerows(track_meta_rows)
+
+    row_count = 0
+    with open(os.path.join(args.output_directory_path, f"{i}_tracks.csv"), "w", newline="") as output_file:
+        output_file.write(",".join(tracks_field_names) + "\r\n")
+        formats = ["%d" if field_name in id_field_names else "%.2f" for field_name in tracks_field_names]
+        for track in tracks:
+            columns = columns_by_track.pop(track["id"])
+            np.savetxt(output_file, np.column_stack([columns[field_name] for field_name in tracks_field_names]),
+                       fmt=formats, delimiter=",", newline="\r\n")
+            row_count += len(columns["frame"])
+
+    # The extraction counts recordings by the four files each one has, the highway image included
+    open(os.path.join(args.output_directory_path, f"{i}_highway.png"), "wb").close()
+
+    return row_count
+
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    row_count = 0
+    for i in range(1, args.recordings + 1):
+        row_count += generate_recording(i, args, rng)
+    return row_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generates synthetic recordings in the format of the High-D dataset")
+    arg_parser.add_argument("output_directory_path")
+    arg_parser.add_argument("--recordings", type=int, default=3)
+    arg_parser.add_argument("--tracks", type=int, default=200)
+    arg_parser.add_argument("--frames", type=int, default=10000)
+    arg_parser.add_argument("--lanes", type=int, default=6)
+    arg_parser.add_argument("--convoys", type=int, default=10)
+    arg_parser.add_argument("--frame-rate", type=float, default=25.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if not os.path.isdir(args.output_directory_path):
+        raise ValueError(f"Output directory path {args.output_directory_path} is not a valid directory")
+
+    for name in ("recordings", "tracks", "frames", "lanes"):
+        if getattr(args, name) < 1:
+            raise ValueError(f"Number of {name} {getattr(args, name)} must be at least 1")
+
+    if args.convoys < 0:
+        raise ValueError(f"Number of convoys {args.convoys} must not be negative")
+
+    row_count = generate(args)
+
+    print(f"Generated {args.recordings} recordings with {row_count} track rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import os
+import numpy as np
+
+
+# Generates the ground truth of each scene, which is shared by every threshold as it is for the real methods
+def generate_ground_truths(rng, scene_count, maximum_independent_agents):
+    ground_truths = []
+    for j in range(scene_count):
+        # Each scene draws its agents from its own block of ids, so that no two scenes share a file name
+        agent_count = 2 + int(rng.integers(1, maximum_independent_agents + 1))
+        agent_ids = (j * (2 + maximum_independent_agents) + 1
+                     + rng.permutation(2 + maximum_independent_agents)[:agent_count]).tolist()
+        scene_id = int(rng.integers(1, 61))
+        ground_truths.append({
+            "scene_id": scene_id,
+            "convoy_head_id": agent_ids[0],
+            "convoy_tail_id": agent_ids[1],
+            "independent_ids": sorted(agent_ids[2:])
+        })
+    return ground_truths
+
+
+# Discovers the true link from the convoy head to the tail with the given probability, alongside each other possible
+# link with the given false link probability
+def generate_causal_links(rng, ground_truth, detection_probability, false_link_probability):
+    agent_ids = [ground_truth["convoy_head_id"], ground_truth["convoy_tail_id"]] + ground_truth["independent_ids"]
+
+    causal_links = {}
+    if rng.random() < detection_probability:
+        causal_links[str(agent_ids[0])] = [agent_ids[1]]
+    for cause_id in agent_ids:
+        for effect_id in agent_ids:
+            if cause_id == effect_id or (cause_id == agent_ids[0] and effect_id == agent_ids[1]):
+                continue
+            if rng.random() < false_link_probability:
+                causal_links.setdefault(str(cause_id), []).append(effect_id)
+
+    return causal_links
+
+
+# Writes scenes in the layout of the SimCARS output, as {threshold}/scene-*.json beneath the output directory. Higher
+# thresholds discover fewer links, both true and false. Returns the number of scene files written.
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    ground_truths = generate_ground_truths(rng, args.scenes, args.maximum_independent_agents)
+
+    thresholds = sorted(args.thresholds, key=float)
+    file_count = 0
+    for k, threshold in enumerate(thresholds):
+        threshold_directory_path = os.path.join(args.output_directory_path, threshold)
+        os.makedirs(threshold_directory_path, exist_ok=True)
+
+        scale = 1.0 - k / (2 * len(thresholds))
+        for ground_truth in ground_truths:
+            scene_json = dict(ground_truth)
+            for links_key in args.links_keys:
+                scene_json[links_key] = generate_causal_links(rng, ground_truth, args.detection_probability * scale,
+                                                              args.false_link_probability * scale)
+            scene_json["time_elapsed_in_microseconds"] = int(rng.lognormal(16.0, 1.0))
+
+            scene_file_name = (f"scene-{ground_truth['scene_id']}-{ground_truth['convoy_tail_id']}_follows_"
+                               f"{ground_truth['convoy_head_id']}-{len(ground_truth['independent_ids'])}_independent")
+            with open(os.path.join(threshold_directory_path, f"{scene_file_name}.json"), "w") as output_file:
+                json.dump(scene_json, output_file, separators=(",", ":"))
+            file_count += 1
+
+    return file_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generates synthetic causal discovery output in the layout of SimCARS")
+    arg_parser.add_argument("output_directory_path")
+    arg_parser.add_argument("--scenes", type=int, default=115)
+    arg_parser.add_argument("--thresholds", nargs="+", default=["0.1", "0.2", "0.3", "0.4", "0.5"])
+    arg_parser.add_argument("--links-keys", nargs="+", default=["causal_links"])
+    arg_parser.add_argument("--maximum-independent-agents", type=int, default=5)
+    arg_parser.add_argument("--detection-probability", type=float, default=0.8)
+    arg_parser.add_argument("--false-link-probability", type=float, default=0.05)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if not os.path.isdir(args.output_directory_path):
+        raise ValueError(f"Output directory path {args.output_directory_path} is not a valid directory")
+
+    if args.scenes < 1:
+        raise ValueError(f"Number of scenes {args.scenes} must be at least 1")
+
+    if args.maximum_independent_agents < 1:
+        raise ValueError(f"Maximum number of independent agents {args.maximum_independent_agents} must be at least 1")
+
+    for threshold in args.thresholds:
+        try:
+            float(threshold)
+        except ValueError:
+            raise ValueError(f"Threshold {threshold} is not a number")
+
+    for links_key in args.links_keys:
+        if not links_key.endswith("causal_links"):
+            raise ValueError(f"Links key {links_key} must end in causal_links")
+
+    file_count = generate(args)
+
+    print(f"Generated {file_count} scene files across {len(args.thresholds)} thresholds")
+
+
+if __name__ == "__main__":
+    main()
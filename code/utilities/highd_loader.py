@@ -0,0 +1,461 @@
+import csv
+import io
+import os
+import numpy as np
+
+
+recording_meta_dtypes = {
+    "id": np.int64,
+    "frameRate": np.float64,
+    "locationId": np.int64,
+    "speedLimit": np.float64,
+    "month": np.int64,
+    "duration": np.float64,
+    "totalDrivenDistance": np.float64,
+    "totalDrivenTime": np.float64,
+    "numVehicles": np.int64,
+    "numCars": np.int64,
+    "numTrucks": np.int64
+}
+
+tracks_meta_dtypes = {
+    "id": np.int64,
+    "width": np.float64,
+    "height": np.float64,
+    "initialFrame": np.int64,
+    "finalFrame": np.int64,
+    "numFrames": np.int64,
+    "drivingDirection": np.int64,
+    "traveledDistance": np.float64,
+    "minXVelocity": np.float64,
+    "maxXVelocity": np.float64,
+    "meanXVelocity": np.float64,
+    "minDHW": np.float64,
+    "minTHW": np.float64,
+    "minTTC": np.float64,
+    "numLaneChanges": np.int64
+}
+
+tracks_dtypes = {
+    "frame": np.int64,
+    "id": np.int64,
+    "x": np.float64,
+    "y": np.float64,
+    "width": np.float64,
+    "height": np.float64,
+    "xVelocity": np.float64,
+    "yVelocity": np.float64,
+    "xAcceleration": np.float64,
+    "yAcceleration": np.float64,
+    "frontSightDistance": np.float64,
+    "backSightDistance": np.float64,
+    "dhw": np.float64,
+    "thw": np.float64,
+    "ttc": np.float64,
+    "precedingXVelocity": np.float64,
+    "precedingId": np.int64,
+    "followingId": np.int64,
+    "leftPrecedingId": np.int64,
+    "leftAlongsideId": np.int64,
+    "leftFollowingId": np.int64,
+    "rightPrecedingId": np.int64,
+    "rightAlongsideId": np.int64,
+    "rightFollowingId": np.int64,
+    "laneId": np.int64
+}
+
+# Columns of the tracks file required in order to extract convoy scenes
+extraction_track_columns = ["frame", "id", "x", "y", "xVelocity", "xAcceleration", "followingId", "laneId"]
+
+# Columns of the tracks file summarised for each track when streaming, and the size of each chunk read while streaming
+summary_track_columns = ["id", "followingId", "laneId"]
+streaming_chunk_bytes = 4 * 1024 * 1024
+
+
+def read_header(file_path):
+    with open(file_path, "r") as input_file:
+        return next(csv.reader(input_file), None)
+
+
+def read_columns(file_path, dtypes):
+    with open(file_path, "r") as input_file:
+        csv_reader = csv.reader(input_file)
+        fieldnames = next(csv_reader, None)
+        if fieldnames is None:
+            return None, {}
+        rows = list(csv_reader)
+
+    values = list(zip(*rows)) if len(rows) > 0 else [()] * len(fieldnames)
+
+    columns = {}
+    for fieldname, column_values in zip(fieldnames, values):
+        dtype = dtypes.get(fieldname, np.str_)
+        if dtype is np.str_:
+            columns[fieldname] = np.array(column_values, dtype=np.str_)
+        else:
+            columns[fieldname] = np.array(column_values, dtype=np.float64).astype(dtype)
+
+    return fieldnames, columns
+
+
+def load_track_columns(source, fieldnames, columns, skiprows=0):
+    usecols = [fieldnames.index(column) for column in columns]
+    data = np.loadtxt(source, delimiter=",", skiprows=skiprows, usecols=usecols, dtype=np.float64, ndmin=2)
+    return {column: np.ascontiguousarray(data[:, j], dtype=tracks_dtypes.get(column, np.float64))
+            for j, column in enumerate(columns)}
+
+
+def extraction_columns(fieldnames, columns):
+    if columns is None:
+        return fieldnames
+    elif "id" not in columns:
+        return ["id"] + list(columns)
+    return columns
+
+
+# The first positive following id of a track alongside the lane it was in at the time, or None where the track has no
+# following agent or is followed by more than one
+def track_following(following_ids, lane_ids):
+    following_indices = np.flatnonzero(following_ids > 0)
+    if len(following_indices) == 0:
+        return None
+
+    following_id = int(following_ids[following_indices[0]])
+    if np.any(following_ids[following_indices] != following_id):
+        return None
+
+    return following_id, int(lane_ids[following_indices[0]])
+
+
+class RecordingMeta:
+    def __init__(self, file_path):
+        self.fieldnames, columns = read_columns(file_path, recording_meta_dtypes)
+        self.values = None
+        if self.fieldnames is not None and len(columns[self.fieldnames[0]]) > 0:
+            self.values = {fieldname: columns[fieldname][0].item() for fieldname in self.fieldnames}
+
+    def __getitem__(self, fieldname):
+        return self.values[fieldname]
+
+
+class TracksMeta:
+    def __init__(self, file_path):
+        self.fieldnames, self.columns = read_columns(file_path, tracks_meta_dtypes)
+        if self.fieldnames is None:
+            self.fieldnames = []
+            self.columns = {"id": np.empty(0, dtype=np.int64)}
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, fieldname):
+        return self.columns[fieldname]
+
+
+# Merges row ranges which directly follow one another, so that they can be copied out as a single block
+def merge_row_ranges(starts, stops):
+    row_ranges = []
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        if len(row_ranges) > 0 and row_ranges[-1][1] == start:
+            row_ranges[-1][1] = stop
+        else:
+            row_ranges.append([start, stop])
+    return row_ranges
+
+
+# Writes whole lines of a CSV file in the same form csv.DictWriter produces
+def write_csv_text(output_file, text, quoted):
+    text = text.replace(b"\r\n", b"\n")
+    if not text.endswith(b"\n"):
+        text += b"\n"
+
+    if quoted:
+        csv.writer(output_file).writerows(csv.reader(io.StringIO(text.decode())))
+    else:
+        output_file.write(text.replace(b"\n", b"\r\n").decode())
+
+
+# Unparsed rows of a CSV file held in memory alongside the offset of each line, so that any subset of rows can be copied
+# out again without re-reading the file
+class RawRows:
+    def __init__(self, file_path):
+        with open(file_path, "rb") as input_file:
+            self.buffer = input_file.read()
+
+        newlines = np.flatnonzero(np.frombuffer(self.buffer, dtype=np.uint8) == ord("\n"))
+        self.line_starts = np.concatenate(([0], newlines + 1))
+        if self.line_starts[-1] < len(self.buffer):
+            self.line_starts = np.append(self.line_starts, len(self.buffer))
+        self.quoted = b'"' in self.buffer
+
+    def __len__(self):
+        return max(len(self.line_starts) - 2, 0)
+
+    # Writes the header followed by the rows in each [start, stop) range in the same form csv.DictWriter produces
+    def write_csv(self, output_file, row_ranges):
+        chunks = [self.buffer[:self.line_starts[1]]]
+        for start, stop in row_ranges:
+            chunks.append(self.buffer[self.line_starts[start + 1]:self.line_starts[stop + 1]])
+
+        write_csv_text(output_file, b"".join(chunks), self.quoted)
+
+
+# Rows of a CSV file left on disk, addressed through the row and byte offsets at which each run of rows starts, followed
+# by those at which the last run stops, so that whole runs can be copied out of the file one at a time
+class RunRows:
+    def __init__(self, file_path, header_length, run_row_offsets, run_byte_offsets):
+        self.file_path = file_path
+        self.header_length = header_length
+        self.row_offsets = run_row_offsets
+        self.byte_offsets = run_byte_offsets
+
+    def __len__(self):
+        return int(self.row_offsets[-1])
+
+    # Writes the header followed by the rows in each [start, stop) range, each of which must start and stop on the
+    # boundaries of runs
+    def write_csv(self, output_file, row_ranges):
+        with open(self.file_path, "rb") as input_file:
+            write_csv_text(output_file, input_file.read(self.header_length), False)
+            for start, stop in row_ranges:
+                first_run = np.searchsorted(self.row_offsets, start)
+                last_run = np.searchsorted(self.row_offsets, stop)
+                for run in range(first_run, last_run):
+                    input_file.seek(self.byte_offsets[run])
+                    text = input_file.read(self.byte_offsets[run + 1] - self.byte_offsets[run])
+                    write_csv_text(output_file, text, b'"' in text)
+
+
+# The tracks file is sorted by track id, so the frames of each track form one contiguous run within each column which
+# is addressed through the offset / length index
+class Tracks:
+    def __init__(self, file_path, columns=None, cache_file_path=None):
+        if cache_file_path is not None and os.path.isfile(cache_file_path):
+            self.load_cache(cache_file_path)
+        else:
+            self.parse(file_path, columns)
+            if cache_file_path is not None:
+                self.save_cache(cache_file_path)
+
+        self.build_index()
+
+    def parse(self, file_path, columns):
+        self.fieldnames = read_header(file_path)
+        if self.fieldnames is None:
+            self.fieldnames = []
+
+        self.columns = {}
+        if len(self.fieldnames) > 0:
+            self.columns = load_track_columns(file_path, self.fieldnames, extraction_columns(self.fieldnames, columns),
+                                              skiprows=1)
+
+    def load_cache(self, cache_file_path):
+        with np.load(cache_file_path) as cache:
+            self.fieldnames = cache["fieldnames"].tolist()
+            self.columns = {}
+            for column in cache["columns"].tolist():
+                self.columns[column] = cache[f"column_{column}"]
+
+    # Written to a temporary file first so that concurrent workers never see a partially written cache
+    def save_cache(self, cache_file_path):
+        arrays = {
+            "fieldnames": np.array(self.fieldnames, dtype=np.str_),
+            "columns": np.array(list(self.columns.keys()), dtype=np.str_)
+        }
+        for column in self.columns.keys():
+            arrays[f"column_{column}"] = self.columns[column]
+
+        temporary_file_path = f"{cache_file_path}.{os.getpid()}.tmp"
+        with open(temporary_file_path, "wb") as cache_file:
+            np.savez(cache_file, **arrays)
+        os.replace(temporary_file_path, cache_file_path)
+
+    def build_index(self):
+        ids = self.columns.get("id", np.empty(0, dtype=np.int64))
+        if len(ids) > 0:
+            self.offsets = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        else:
+            self.offsets = np.empty(0, dtype=np.int64)
+        self.lengths = np.diff(np.append(self.offsets, len(ids)))
+
+        self.run_ids = ids[self.offsets]
+
+        # Where a track id re-occurs later in the file the later run takes precedence, as it always has
+        self.track_index = {}
+        for index, track_id in enumerate(self.run_ids.tolist()):
+            self.track_index[track_id] = index
+
+    def __len__(self):
+        return len(self.columns.get("id", ()))
+
+    def __contains__(self, track_id):
+        return track_id in self.track_index
+
+    def track_ids(self):
+        return self.track_index.keys()
+
+    def frames(self, track_id):
+        index = self.track_index[track_id]
+        offset = self.offsets[index]
+        return TrackFrames(self.columns, offset, offset + self.lengths[index])
+
+    def initial_lane_id(self, track_id):
+        return int(self.columns["laneId"][self.offsets[self.track_index[track_id]]])
+
+    def following(self, track_id):
+        frames = self.frames(track_id)
+        return track_following(frames["followingId"], frames["laneId"])
+
+
+# Reads the tracks file in chunks rather than all at once, keeping only what convoy detection needs of each track along
+# with the byte offset of its rows, from which its frames are parsed again on demand. Memory use is bounded by the
+# chunk size and the longest track rather than by the size of the file.
+class StreamingTracks:
+    def __init__(self, file_path, columns=None, chunk_bytes=streaming_chunk_bytes):
+        self.file_path = file_path
+        self.fieldnames = read_header(file_path)
+        if self.fieldnames is None:
+            self.fieldnames = []
+        self.column_names = extraction_columns(self.fieldnames, columns)
+
+        self.scan(chunk_bytes)
+        self.build_index()
+
+    # Parses the summary columns of each chunk of whole lines, holding back the rows of the last track in each chunk
+    # until the track is known to be complete
+    def scan(self, chunk_bytes):
+        runs = {column: [] for column in ("row_offsets", "byte_offsets", "lengths", "ids", "initial_lane_ids",
+                                          "following_ids", "following_lane_ids")}
+        self.row_count = 0
+
+        with open(self.file_path, "rb") as input_file:
+            self.header_length = len(input_file.readline())
+            self.byte_count = self.header_length
+
+            pending = None
+            while len(self.fieldnames) > 0:
+                lines = input_file.readlines(chunk_bytes)
+                final = len(lines) == 0
+
+                columns = pending
+                if not final:
+                    columns = self.parse_summary_columns(lines)
+                    if pending is not None:
+                        columns = {column: np.concatenate((pending[column], columns[column])) for column in columns}
+
+                if columns is not None:
+                    pending = self.summarise_runs(columns, runs, final)
+
+                if final:
+                    break
+
+        self.set_runs(runs)
+
+    def parse_summary_columns(self, lines):
+        line_lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+        columns = load_track_columns(lines, self.fieldnames, summary_track_columns)
+        columns["byte_offset"] = self.byte_count + np.cumsum(line_lengths) - line_lengths
+        self.byte_count += int(np.sum(line_lengths))
+        return columns
+
+    # Adds a summary of each complete run of rows to the runs, returning the rows of the last run where it may continue
+    # into the next chunk
+    def summarise_runs(self, columns, runs, final):
+        ids = columns["id"]
+        if len(ids) == 0:
+            return None
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        if not final:
+            pending = {column: values[starts[-1]:] for column, values in columns.items()}
+            starts = starts[:-1]
+            stop = len(ids) - len(pending["id"])
+            if len(starts) == 0:
+                return pending
+        else:
+            pending = None
+            stop = len(ids)
+
+        lengths = np.diff(np.append(starts, stop))
+        for start, length in zip(starts.tolist(), lengths.tolist()):
+            following = track_following(columns["followingId"][start:start + length],
+                                        columns["laneId"][start:start + length])
+            runs["following_ids"].append(-1 if following is None else following[0])
+            runs["following_lane_ids"].append(-1 if following is None else following[1])
+
+        runs["row_offsets"].append(self.row_count + starts)
+        runs["byte_offsets"].append(columns["byte_offset"][starts])
+        runs["lengths"].append(lengths)
+        runs["ids"].append(ids[starts])
+        runs["initial_lane_ids"].append(columns["laneId"][starts])
+        self.row_count += stop
+
+        return pending
+
+    def set_runs(self, runs):
+        def concatenate(arrays):
+            return np.concatenate([np.empty(0, dtype=np.int64)] + arrays).astype(np.int64)
+
+        self.offsets = concatenate(runs["row_offsets"])
+        self.byte_offsets = np.append(concatenate(runs["byte_offsets"]), self.byte_count)
+        self.lengths = concatenate(runs["lengths"])
+        self.run_ids = concatenate(runs["ids"])
+        self.initial_lane_ids = concatenate(runs["initial_lane_ids"])
+        self.following_ids = np.array(runs["following_ids"], dtype=np.int64)
+        self.following_lane_ids = np.array(runs["following_lane_ids"], dtype=np.int64)
+
+    # Where a track id re-occurs later in the file the later run takes precedence, as it does for Tracks
+    def build_index(self):
+        self.track_index = {}
+        for index, track_id in enumerate(self.run_ids.tolist()):
+            self.track_index[track_id] = index
+
+    def __len__(self):
+        return self.row_count
+
+    def __contains__(self, track_id):
+        return track_id in self.track_index
+
+    def track_ids(self):
+        return self.track_index.keys()
+
+    def frames(self, track_id):
+        index = self.track_index[track_id]
+        with open(self.file_path, "rb") as input_file:
+            input_file.seek(self.byte_offsets[index])
+            text = input_file.read(self.byte_offsets[index + 1] - self.byte_offsets[index])
+        columns = load_track_columns(io.BytesIO(text), self.fieldnames, self.column_names)
+        return TrackFrames(columns, 0, self.lengths[index])
+
+    def initial_lane_id(self, track_id):
+        return int(self.initial_lane_ids[self.track_index[track_id]])
+
+    def following(self, track_id):
+        index = self.track_index[track_id]
+        if self.following_ids[index] < 0:
+            return None
+        return int(self.following_ids[index]), int(self.following_lane_ids[index])
+
+    def raw_rows(self):
+        return RunRows(self.file_path, self.header_length, np.append(self.offsets, self.row_count), self.byte_offsets)
+
+
+class TrackFrames:
+    def __init__(self, columns, start, stop):
+        self.columns = columns
+        self.start = int(start)
+        self.stop = int(stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, column):
+        return self.columns[column][self.start:self.stop]
+
+    # Frames are stored in ascending order for each track, so the frames within a window can be found by bisection
+    # and returned as a view onto the same columns
+    def between(self, first_frame, last_frame):
+        frame_numbers = self["frame"]
+        start = np.searchsorted(frame_numbers, first_frame, side="left")
+        stop = np.searchsorted(frame_numbers, last_frame, side="right")
+        return TrackFrames(self.columns, self.start + start, self.start + max(start, stop))
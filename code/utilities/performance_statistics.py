@@ -0,0 +1,165 @@
+import csv
+import multiprocessing
+import numpy as np
+
+
+metric_names = ["precision", "fallout", "recall", "f1_score"]
+
+# Resamples are drawn in fixed size chunks, each from its own child of the seed, so that the results for a given seed
+# are the same however many worker processes the chunks are spread over
+chunk_resample_count = 1000
+
+
+def safe_divide(numerators, denominators):
+    quotients = np.zeros(np.broadcast(numerators, denominators).shape, dtype=np.float64)
+    np.divide(numerators, denominators, out=quotients, where=denominators != 0)
+    return quotients
+
+
+# The counterpart of calculate_metrics for arrays whose last axis holds the TP, FP, FN and TN counts
+def calculate_metrics_array(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    tp_counts, fp_counts, fn_counts, tn_counts = (counts[..., j] for j in range(4))
+
+    precision = safe_divide(tp_counts, tp_counts + fp_counts)
+    fallout = safe_divide(fp_counts, fp_counts + tn_counts)
+    recall = safe_divide(tp_counts, tp_counts + fn_counts)
+    f1_score = safe_divide(2 * tp_counts, 2 * tp_counts + fp_counts + fn_counts)
+
+    return np.stack((precision, fallout, recall, f1_score), axis=-1)
+
+
+# Each bootstrap resample is drawn as the number of times each scene recurs within it, so that the total counts of all
+# resamples in a chunk are found by a single product with the per-scene count matrix
+def bootstrap_chunk(arguments):
+    scene_counts, resample_count, seed_sequence = arguments
+    rng = np.random.default_rng(seed_sequence)
+    scene_count = len(scene_counts)
+    weights = rng.multinomial(scene_count, np.full(scene_count, 1 / scene_count), size=resample_count)
+    return calculate_metrics_array(weights @ scene_counts)
+
+
+# Each randomisation swaps the counts of the two evaluations for a random half of the scenes. Returns the number of
+# randomisations in which the difference in each metric is at least as large as the observed difference.
+def randomisation_chunk(arguments):
+    scene_counts, other_scene_counts, resample_count, seed_sequence = arguments
+    rng = np.random.default_rng(seed_sequence)
+    swaps = rng.random((resample_count, len(scene_counts))) < 0.5
+
+    total_counts = scene_counts.sum(axis=0)
+    other_total_counts = other_scene_counts.sum(axis=0)
+    observed_differences = np.abs(calculate_metrics_array(total_counts) - calculate_metrics_array(other_total_counts))
+
+    swapped_total_counts = total_counts + swaps @ (other_scene_counts - scene_counts)
+    swapped_other_total_counts = total_counts + other_total_counts - swapped_total_counts
+    differences = np.abs(calculate_metrics_array(swapped_total_counts)
+                         - calculate_metrics_array(swapped_other_total_counts))
+
+    return np.count_nonzero(differences >= observed_differences - 1e-12, axis=0)
+
+
+class Resampler:
+    def __init__(self, resample_count, confidence_level=0.95, seed=0, jobs=1):
+        if resample_count < 1:
+            raise ValueError(f"Number of resamples {resample_count} must be at least 1")
+        if not 0 < confidence_level < 1:
+            raise ValueError(f"Confidence level {confidence_level} must lie between 0 and 1")
+
+        self.resample_count = resample_count
+        self.confidence_level = confidence_level
+        self.seed = seed
+        self.jobs = jobs
+        self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def chunks(self):
+        chunk_count = -(-self.resample_count // chunk_resample_count)
+        seed_sequences = np.random.SeedSequence(self.seed).spawn(chunk_count)
+        for j, seed_sequence in enumerate(seed_sequences):
+            yield min(chunk_resample_count, self.resample_count - j * chunk_resample_count), seed_sequence
+
+    # The worker pool is only started once it is first needed
+    def map(self, function, arguments):
+        if self.jobs == 1:
+            return list(map(function, arguments))
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.jobs)
+        return self.pool.map(function, arguments)
+
+    def parameters_json(self):
+        return {
+            "resamples": self.resample_count,
+            "confidence_level": self.confidence_level,
+            "seed": self.seed
+        }
+
+    # Percentile bootstrap confidence intervals of each metric over the scenes, given one row of TP, FP, FN and TN
+    # counts per scene
+    def confidence_intervals(self, scene_counts):
+        scene_counts = np.asarray(scene_counts, dtype=np.int64).reshape(-1, 4)
+        if len(scene_counts) == 0:
+            return {metric_name: [0, 0] for metric_name in metric_names}
+
+        resampled_metrics = np.concatenate(self.map(bootstrap_chunk, [
+            (scene_counts, resample_count, seed_sequence) for resample_count, seed_sequence in self.chunks()]))
+
+        alpha = 1 - self.confidence_level
+        bounds = np.quantile(resampled_metrics, [alpha / 2, 1 - alpha / 2], axis=0)
+
+        return {metric_name: bounds[:, j].tolist() for j, metric_name in enumerate(metric_names)}
+
+    # Two-sided p-values of a paired randomisation test of each metric, where the two evaluations list the counts of the
+    # same scenes in the same order
+    def paired_p_values(self, scene_counts, other_scene_counts):
+        scene_counts = np.asarray(scene_counts, dtype=np.int64).reshape(-1, 4)
+        other_scene_counts = np.asarray(other_scene_counts, dtype=np.int64).reshape(-1, 4)
+        if len(scene_counts) != len(other_scene_counts):
+            raise ValueError(f"Paired evaluations cover {len(scene_counts)} and {len(other_scene_counts)} scenes")
+
+        exceedance_counts = sum(self.map(randomisation_chunk, [
+            (scene_counts, other_scene_counts, resample_count, seed_sequence)
+            for resample_count, seed_sequence in self.chunks()]))
+
+        p_values = (exceedance_counts + 1) / (self.resample_count + 1)
+
+        return {metric_name: p_values[j].item() for j, metric_name in enumerate(metric_names)}
+
+
+# Reads the name and the TP, FP, FN and TN counts of each scene back from the scene counts file of an evaluation
+def read_scene_counts(scene_counts_file_path):
+    with open(scene_counts_file_path, "r", newline="") as scene_counts_file:
+        csv_reader = csv.reader(scene_counts_file)
+        header = next(csv_reader, [])
+        if header[:5] != ["scene", "tp", "fp", "fn", "tn"]:
+            raise ValueError(f"Scene counts file {scene_counts_file_path} does not list the name and the TP, FP, FN and "
+                             f"TN counts of each scene")
+        rows = [row for row in csv_reader if len(row) > 0]
+
+    scene_names = [row[0] for row in rows]
+    if len(set(scene_names)) != len(scene_names):
+        raise ValueError(f"Scene counts file {scene_counts_file_path} names some of its scenes more than once")
+
+    return scene_names, np.array([row[1:5] for row in rows], dtype=np.int64).reshape(-1, 4)
+
+
+# Orders the counts of another evaluation's scenes as the named scenes of an evaluation, so that each scene is paired
+# with itself, given that both evaluations cover exactly the same scenes
+def paired_scene_counts(scene_names, other_scene_names, other_scene_counts):
+    other_positions = {scene_name: position for position, scene_name in enumerate(other_scene_names)}
+
+    missing_scene_names = [scene_name for scene_name in scene_names if scene_name not in other_positions]
+    extra_scene_names = sorted(set(other_scene_names) - set(scene_names))
+    if len(missing_scene_names) > 0:
+        raise ValueError(f"{len(missing_scene_names)} scenes of the evaluation, such as {missing_scene_names[0]}, are "
+                         f"missing from the paired evaluation")
+    if len(extra_scene_names) > 0:
+        raise ValueError(f"{len(extra_scene_names)} scenes of the paired evaluation, such as {extra_scene_names[0]}, are "
+                         f"missing from the evaluation")
+    if len(scene_names) != len(other_scene_names):
+        raise ValueError(f"Paired evaluations cover {len(scene_names)} and {len(other_scene_names)} scenes")
+
+    return np.asarray(other_scene_counts)[[other_positions[scene_name] for scene_name in scene_names]]
@@ -0,0 +1,91 @@
+import json
+import zipfile
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+meta_keys = ["scene_id", "convoy_head_id", "convoy_tail_id", "independent_ids", "first_frame", "last_frame"]
+
+
+def check_parquet_support():
+    if pyarrow is None:
+        raise ValueError("Parquet output requires the pyarrow package to be installed")
+
+
+# The archive is left uncompressed so that the time series member can be memory-mapped by read_scene_npz
+def write_scene_npz(output_file_path, field_names, time_series, scene_meta):
+    arrays = {
+        "time_series": np.ascontiguousarray(time_series, dtype=np.float64),
+        "column_names": np.array(field_names, dtype=np.str_)
+    }
+    for key in meta_keys:
+        arrays[key] = np.array(scene_meta[key], dtype=np.int64)
+
+    with open(output_file_path, "wb") as output_file:
+        np.savez(output_file, **arrays)
+
+
+def write_scene_parquet(output_file_path, field_names, time_series, scene_meta):
+    check_parquet_support()
+
+    columns = [pyarrow.array(np.arange(len(time_series), dtype=np.int64))]
+    for j in range(len(field_names)):
+        columns.append(pyarrow.array(time_series[:, j]))
+
+    table = pyarrow.Table.from_arrays(columns, names=["time_index"] + list(field_names))
+    table = table.replace_schema_metadata({"scene_meta": json.dumps({key: scene_meta[key] for key in meta_keys})})
+    pyarrow.parquet.write_table(table, output_file_path, compression="none")
+
+
+def memory_map_npz_member(input_file_path, member_name):
+    with zipfile.ZipFile(input_file_path) as archive:
+        info = archive.getinfo(f"{member_name}.npy")
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+
+    with open(input_file_path, "rb") as input_file:
+        input_file.seek(info.header_offset)
+        local_header = input_file.read(30)
+        name_length = int.from_bytes(local_header[26:28], "little")
+        extra_length = int.from_bytes(local_header[28:30], "little")
+        input_file.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(input_file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(input_file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(input_file)
+        offset = input_file.tell()
+
+    return np.memmap(input_file_path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+
+# Returns the time series matrix as a read-only memory map without copying it, alongside its column names and the
+# scene metadata
+def read_scene_npz(input_file_path):
+    with np.load(input_file_path) as scene:
+        field_names = scene["column_names"].tolist()
+        scene_meta = {key: scene[key].tolist() for key in meta_keys}
+
+        time_series = memory_map_npz_member(input_file_path, "time_series")
+        if time_series is None:
+            time_series = scene["time_series"]
+
+    return time_series, field_names, scene_meta
+
+
+def read_scene_parquet(input_file_path):
+    check_parquet_support()
+
+    table = pyarrow.parquet.read_table(input_file_path, memory_map=True)
+    scene_meta = json.loads(table.schema.metadata[b"scene_meta"])
+    field_names = table.column_names[1:]
+    time_series = np.column_stack([table.column(field_name).to_numpy() for field_name in field_names])
+
+    return time_series, field_names, scene_meta
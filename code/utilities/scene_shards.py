@@ -0,0 +1,138 @@
+import glob
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+shard_file_extension = ".jsonl"
+index_file_extension = ".idx"
+
+
+# orjson is used to read shards where it is installed, falling back on the json module otherwise
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Shards are always written with the json module, as orjson writes numbers such as 1e+16 and 1e-07 differently and
+# turns non-finite floats into null, so that the bytes of a shard would depend on the packages installed. Non-finite
+# floats are refused, as neither reader can read them back as they were written.
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode()
+
+
+def is_shard_file_path(file_path):
+    return file_path.endswith(shard_file_extension)
+
+
+def index_file_path(shard_file_path):
+    return os.path.splitext(shard_file_path)[0] + index_file_extension
+
+
+def scene_name(scene_file_path):
+    return os.path.splitext(os.path.basename(scene_file_path))[0]
+
+
+# The scenes of a directory, as its shards followed by any of its scene files that no shard covers, such as those
+# written since the shards were built. A shard older than any of the scene files it covers is passed over in favour of
+# the files, so long as every one of its scenes still has a file.
+def directory_input_file_paths(directory_path):
+    scene_file_paths = sorted(glob.glob(os.path.join(directory_path, "*.json")))
+    scene_modification_times = {scene_name(scene_file_path): os.stat(scene_file_path).st_mtime_ns
+                                for scene_file_path in scene_file_paths}
+
+    input_file_paths = []
+    covered_scene_names = set()
+    for shard_file_path in sorted(glob.glob(os.path.join(directory_path, f"*{shard_file_extension}"))):
+        shard_modification_time = os.stat(shard_file_path).st_mtime_ns
+        names = SceneShard(shard_file_path).names
+        if any(scene_modification_times.get(name, shard_modification_time) > shard_modification_time
+               for name in names):
+            missing_names = [name for name in names if name not in scene_modification_times]
+            if len(missing_names) > 0:
+                raise ValueError(f"Shard {shard_file_path} is older than some of its scene files while scenes such as "
+                                 f"{missing_names[0]} have no scene file, so it must be rebuilt")
+            continue
+
+        input_file_paths.append(shard_file_path)
+        covered_scene_names.update(names)
+
+    return input_file_paths + [scene_file_path for scene_file_path in scene_file_paths
+                               if scene_name(scene_file_path) not in covered_scene_names]
+
+
+# Writes scene records as the lines of a JSON Lines shard, alongside an index of the name of each scene and the byte
+# offset of its line. Both files are written under temporary names and only replace any earlier shard once closed.
+class SceneShardWriter:
+    def __init__(self, shard_file_path):
+        self.shard_file_path = shard_file_path
+        self.temporary_file_path = f"{shard_file_path}.{os.getpid()}.tmp"
+        self.shard_file = open(self.temporary_file_path, "wb")
+        self.names = []
+        self.offsets = [0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.shard_file.close()
+            os.remove(self.temporary_file_path)
+
+    def add(self, name, scene_json):
+        try:
+            line = dumps(scene_json) + b"\n"
+        except ValueError as error:
+            raise ValueError(f"Scene {name} cannot be written to a shard: {error}")
+        self.shard_file.write(line)
+        self.names.append(name)
+        self.offsets.append(self.offsets[-1] + len(line))
+
+    def close(self):
+        self.shard_file.close()
+
+        temporary_index_file_path = f"{index_file_path(self.shard_file_path)}.{os.getpid()}.tmp"
+        with open(temporary_index_file_path, "wb") as index_file:
+            index_file.write(dumps({"names": self.names, "offsets": self.offsets}))
+
+        os.replace(self.temporary_file_path, self.shard_file_path)
+        os.replace(temporary_index_file_path, index_file_path(self.shard_file_path))
+
+        return [self.shard_file_path, index_file_path(self.shard_file_path)]
+
+
+# A shard of scene records, which is read in full with a single sequential read, or one scene at a time through its
+# index
+class SceneShard:
+    def __init__(self, shard_file_path):
+        self.shard_file_path = shard_file_path
+        with open(index_file_path(shard_file_path), "rb") as index_file:
+            index_json = loads(index_file.read())
+        self.names = index_json["names"]
+        self.offsets = index_json["offsets"]
+        self.positions = {name: position for position, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def scenes(self):
+        with open(self.shard_file_path, "rb") as shard_file:
+            data = shard_file.read()
+
+        if len(data) != self.offsets[-1]:
+            raise ValueError(f"Shard {self.shard_file_path} does not match its index")
+
+        return [loads(line) for line in data.splitlines()]
+
+    def scene(self, name):
+        position = self.positions[name]
+        with open(self.shard_file_path, "rb") as shard_file:
+            shard_file.seek(self.offsets[position])
+            return loads(shard_file.read(self.offsets[position + 1] - self.offsets[position]))
@@ -0,0 +1,20 @@
+import argparse
+import os
+import sys
+
+import pytest
+
+# The utilities are flat scripts importing one another by module name, so the tests import them in the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_synthetic_highd  # noqa: E402
+
+
+# A small set of synthetic highD recordings, each with convoys planted to meet the default extraction thresholds
+@pytest.fixture(scope="session")
+def synthetic_highd_path(tmp_path_factory):
+    highd_directory_path = tmp_path_factory.mktemp("highd")
+    generate_synthetic_highd.generate(argparse.Namespace(
+        output_directory_path=str(highd_directory_path), recordings=2, tracks=60, frames=2000, lanes=4, convoys=4,
+        frame_rate=25.0, seed=0))
+    return str(highd_directory_path)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+import convoy_scenes
+from highd_loader import TrackFrames
+
+
+def track_frames(rng, frame_count, offset=0):
+    x_velocity = rng.uniform(20.0, 40.0, frame_count + offset)
+    columns = {
+        "frame": np.arange(frame_count + offset, dtype=np.int64),
+        "x": np.cumsum(x_velocity * 0.04) + rng.uniform(0.0, 400.0),
+        "y": rng.uniform(5.0, 30.0) + np.cumsum(rng.normal(0.0, 0.01, frame_count + offset)),
+        "xVelocity": x_velocity,
+        "xAcceleration": rng.normal(0.0, 0.5, frame_count + offset)
+    }
+    return TrackFrames(columns, offset, frame_count + offset)
+
+
+# The per-row accumulation of the distance travelled by each agent that scene_time_series replaced
+def row_distances_travelled(frames, frame_count):
+    x = frames["x"].tolist()
+    y = frames["y"].tolist()
+
+    distances = []
+    distance_travelled = None
+    previous_position = None
+    for i in range(frame_count):
+        position = np.array((x[i], y[i]))
+        if previous_position is None:
+            distance_travelled = 0
+        else:
+            distance_travelled += np.linalg.norm(position - previous_position)
+        distances.append(distance_travelled)
+        previous_position = position
+
+    return distances
+
+
+@pytest.fixture
+def scene_frames():
+    rng = np.random.default_rng(7)
+    followed_frames = track_frames(rng, 250, offset=3)
+    follower_frames = track_frames(rng, 240)
+    independent_frames_dict = {12: track_frames(rng, 260, offset=10), 5: track_frames(rng, 245)}
+    return followed_frames, follower_frames, independent_frames_dict
+
+
+def test_all_kinematic_variables_match_row_logic(scene_frames):
+    followed_frames, follower_frames, independent_frames_dict = scene_frames
+    field_names, matrix = convoy_scenes.scene_time_series(followed_frames, follower_frames, independent_frames_dict,
+                                                          False, True)
+
+    assert field_names == ["c0.a", "c0.v", "c0.p", "c1.a", "c1.v", "c1.p", "i0.a", "i0.v", "i0.p", "i1.a", "i1.v",
+                           "i1.p"]
+    frame_count = 240
+    assert matrix.shape == (frame_count, len(field_names))
+
+    agents = [("c0", followed_frames), ("c1", follower_frames), ("i0", independent_frames_dict[12]),
+              ("i1", independent_frames_dict[5])]
+    for agent_name, frames in agents:
+        acceleration = matrix[:, field_names.index(f"{agent_name}.a")]
+        velocity = matrix[:, field_names.index(f"{agent_name}.v")]
+        assert np.array_equal(acceleration, np.array(frames["xAcceleration"].tolist()[:frame_count]))
+        assert np.array_equal(velocity, np.array(frames["xVelocity"].tolist()[:frame_count]))
+
+    for agent_name, frames in agents[:2]:
+        distances = matrix[:, field_names.index(f"{agent_name}.p")]
+        np.testing.assert_allclose(distances, row_distances_travelled(frames, frame_count), rtol=1e-12, atol=0)
+
+
+# The per-row output shared one distance accumulator between all of the independent agents, so each independent agent
+# is checked against its own accumulation instead
+def test_independent_distances_start_at_zero(scene_frames):
+    followed_frames, follower_frames, independent_frames_dict = scene_frames
+    field_names, matrix = convoy_scenes.scene_time_series(followed_frames, follower_frames, independent_frames_dict,
+                                                          False, True)
+
+    for i, frames in enumerate(independent_frames_dict.values()):
+        distances = matrix[:, field_names.index(f"i{i}.p")]
+        assert distances[0] == 0
+        np.testing.assert_allclose(distances, row_distances_travelled(frames, len(matrix)), rtol=1e-12, atol=0)
+
+
+@pytest.mark.parametrize("velocity_variables, variable, column", [(False, "a", "xAcceleration"),
+                                                                    (True, "v", "xVelocity")])
+def test_single_variable_columns_match_row_logic(scene_frames, velocity_variables, variable, column):
+    followed_frames, follower_frames, independent_frames_dict = scene_frames
+    field_names, matrix = convoy_scenes.scene_time_series(followed_frames, follower_frames, independent_frames_dict,
+                                                          velocity_variables, False)
+
+    assert field_names == [f"c0.{variable}", f"c1.{variable}", f"i0.{variable}", f"i1.{variable}"]
+    for j, frames in enumerate([followed_frames, follower_frames] + list(independent_frames_dict.values())):
+        assert np.array_equal(matrix[:, j], np.array(frames[column].tolist()[:len(matrix)]))
+
+
+def test_single_frame_distance_is_zero():
+    rng = np.random.default_rng(3)
+    assert convoy_scenes.distance_travelled(track_frames(rng, 1), 1).tolist() == [0.0]
+
+
+def test_writers_are_silent_unless_verbose(synthetic_highd_path, tmp_path, capsys):
+    recording = convoy_scenes.Recording(synthetic_highd_path, 1)
+    scene = next(iter(convoy_scenes.find_convoy_scenes(recording, convoy_scenes.SceneParameters())))
+
+    writers = [convoy_scenes.CsvSceneWriter(str(tmp_path)), convoy_scenes.JsonMetaSceneWriter(str(tmp_path)),
+               convoy_scenes.JsonMetaShardSceneWriter(str(tmp_path))]
+    for writer in writers:
+        writer.prepare(scene)
+        writer.write(scene)
+        writer.close()
+    assert capsys.readouterr().out == ""
+
+    writer = convoy_scenes.CsvSceneWriter(str(tmp_path), verbose=True)
+    output_file_paths = writer.write(scene)
+    assert capsys.readouterr().out == f"Generating output for {output_file_paths[0]}\n"
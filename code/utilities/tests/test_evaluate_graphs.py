@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+import evaluate_performance
+
+pytest.importorskip("networkx")
+
+quantitative_experiments_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "data",
+                                             "quantitative_experiments")
+
+
+def read_bytes(file_path):
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("method_name", ["granger_mv", "dynotears", "timino", "random"])
+def test_regenerated_performance_files_match_committed(tmp_path, method_name):
+    method_path = os.path.join(quantitative_experiments_path, method_name)
+    evaluate_performance.evaluate_graphs(os.path.join(method_path, "graphs"), 1, str(tmp_path))
+
+    compared_count = 0
+    for relative_path in evaluate_performance.graph_directory_scenes(os.path.join(method_path, "graphs")):
+        committed_file_paths = evaluate_performance.performance_file_paths(method_path, relative_path)[:2]
+        output_file_paths = evaluate_performance.performance_file_paths(str(tmp_path), relative_path)[:2]
+        for committed_file_path, output_file_path in zip(committed_file_paths, output_file_paths):
+            if os.path.isfile(committed_file_path):
+                assert read_bytes(output_file_path) == read_bytes(committed_file_path), committed_file_path
+                compared_count += 1
+
+    assert compared_count > 0
+
+
+def test_existing_performance_files_are_not_replaced(tmp_path):
+    graphs_path = os.path.join(quantitative_experiments_path, "random", "graphs")
+    evaluate_performance.evaluate_graphs(graphs_path, 1, str(tmp_path))
+    with pytest.raises(ValueError):
+        evaluate_performance.evaluate_graphs(graphs_path, 1, str(tmp_path))
+    evaluate_performance.evaluate_graphs(graphs_path, 1, str(tmp_path), overwrite=True)
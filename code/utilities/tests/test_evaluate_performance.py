@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+import evaluate_performance
+
+quantitative_experiments_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "data",
+                                             "quantitative_experiments")
+
+
+# Execution times are summed in the order in which the scene files are listed, so their standard deviation may differ
+# from the published one in its last digit
+def assert_evaluation_matches(evaluation_json, published_json):
+    assert evaluation_json.keys() == published_json.keys()
+    for key, value in published_json.items():
+        if key == "execution_time":
+            assert evaluation_json[key] == pytest.approx(value, rel=1e-12)
+        elif isinstance(value, dict):
+            assert_evaluation_matches(evaluation_json[key], value)
+        else:
+            assert evaluation_json[key] == value, key
+
+
+@pytest.mark.parametrize("method_name", ["simcars_v1", "simcars_v2"])
+def test_default_counting_matches_published_evaluations(tmp_path, method_name):
+    method_root_path = os.path.join(quantitative_experiments_path, method_name)
+    evaluate_performance.evaluate_sweep(method_root_path, 1, str(tmp_path / "sweep.csv"), str(tmp_path))
+
+    threshold_names = evaluate_performance.threshold_directory_names(method_root_path)
+    assert len(threshold_names) > 0
+    for threshold_name in threshold_names:
+        evaluation_file_name = f"{threshold_name.replace('.', '')}_evaluation.json"
+        with open(tmp_path / evaluation_file_name, "r") as evaluation_file:
+            evaluation_json = json.load(evaluation_file)
+        with open(os.path.join(method_root_path, evaluation_file_name), "r") as published_file:
+            published_json = json.load(published_file)
+        assert_evaluation_matches(evaluation_json, published_json)
+
+
+def scene_counts(causal_links, pair_link_counting):
+    causal_discovery_json = {
+        "convoy_head_id": 10,
+        "convoy_tail_id": 11,
+        "independent_ids": [20, 21, 22],
+        "causal_links": causal_links,
+        "time_elapsed_in_microseconds": 1
+    }
+    result = evaluate_performance.evaluate_scene_json(causal_discovery_json, ["causal_links"], pair_link_counting)
+    if pair_link_counting:
+        result = evaluate_performance.score_batch([result], ["causal_links"])[0]
+    return tuple(result[1]["causal_links"])
+
+
+# Five agents give ten possible links, of which the one between the convoy head and tail is the only true link
+def test_cause_with_several_effects_counts_every_effect():
+    causal_links = {"10": [11, 20, 21], "22": [21]}
+    assert scene_counts(causal_links, True) == (1, 3, 0, 6)
+    # The original counting keeps only the last effect of the head outside the convoy
+    assert scene_counts(causal_links, False) == (1, 2, 0, 7)
+
+
+def test_pair_linked_in_both_directions_counts_once():
+    causal_links = {"11": [10], "10": [11], "20": [21], "21": [20]}
+    assert scene_counts(causal_links, True) == (1, 1, 0, 8)
+
+    # Tail to head alone is still the true link when direction is disregarded
+    assert scene_counts({"11": [10], "20": [22]}, True) == (1, 1, 0, 8)
+    assert scene_counts({"20": [22]}, True) == (0, 1, 1, 8)
+
+
+# The detail file takes the performance_detail layout of the other methods, where a link from the convoy tail to its
+# head is found when direction is disregarded but missed when it is not
+@pytest.mark.parametrize("pair_link_counting", [False, True])
+def test_detail_file_takes_performance_detail_layout(tmp_path, pair_link_counting):
+    scene_file_paths = []
+    for scene_name, causal_links in [("scene-1-11_follows_10-3_independent", {"11": [10], "20": [22]}),
+                                     ("scene-2-11_follows_10-3_independent", {"10": [11, 20]})]:
+        scene_file_paths.append(str(tmp_path / f"{scene_name}.json"))
+        with open(scene_file_paths[-1], "w") as scene_file:
+            json.dump({"convoy_head_id": 10, "convoy_tail_id": 11, "independent_ids": [20, 21, 22],
+                       "causal_links": causal_links, "time_elapsed_in_microseconds": 2500000}, scene_file)
+    evaluate_performance.evaluate(scene_file_paths, "causal_links", 1, str(tmp_path / "evaluation.json"),
+                                  str(tmp_path / "performance_detail"), pair_link_counting)
+
+    with open(tmp_path / "performance_detail", "r") as detail_file:
+        detail_lines = detail_file.read().splitlines()
+    assert detail_lines[0] == f"# {evaluate_performance.performance_detail_header}"
+    assert len(detail_lines) == 3
+    assert [float(value) for value in detail_lines[1].split(";")] == pytest.approx(
+        [1 / 2, 1 / 9, 1, 2 / 3, 0, 2 / 9, 0, 0, 2.5])
+    assert [float(value) for value in detail_lines[2].split(";")] == pytest.approx(
+        [1 / 2, 1 / 9, 1, 2 / 3, 1 / 2, 1 / 9, 1, 2 / 3, 2.5])
+    assert detail_lines[1].split(";")[-1] == "2.500000000000000000e+00"
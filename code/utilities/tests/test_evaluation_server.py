@@ -0,0 +1,112 @@
+import glob
+import os
+import shutil
+import threading
+
+import pytest
+
+import build_scene_shards
+import evaluation_server
+import scene_shards
+
+quantitative_experiments_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "data",
+                                             "quantitative_experiments")
+
+
+def copy_scenes(threshold_directory_path, scene_file_paths, modification_time):
+    for scene_file_path in scene_file_paths:
+        copied_file_path = os.path.join(threshold_directory_path, os.path.basename(scene_file_path))
+        shutil.copyfile(scene_file_path, copied_file_path)
+        os.utime(copied_file_path, ns=(modification_time, modification_time))
+
+
+# Runs a single refresh of the watched methods, as the watch thread does at each interval
+def poll(service, method_root_path):
+    stop_event = threading.Event()
+    stop_event.set()
+    service.watch([method_root_path], 1.0, stop_event)
+
+
+@pytest.fixture
+def method_root_path(tmp_path):
+    scene_file_paths = sorted(glob.glob(os.path.join(quantitative_experiments_path, "simcars_v2", "0.1", "*.json")))
+    threshold_directory_path = tmp_path / "0.1"
+    threshold_directory_path.mkdir()
+    copy_scenes(str(threshold_directory_path), scene_file_paths[:3], 1_000_000_000)
+    return tmp_path, scene_file_paths
+
+
+def test_watch_follows_a_changing_directory_through_a_stale_shard(method_root_path):
+    root_path, scene_file_paths = method_root_path
+    threshold_directory_path = str(root_path / "0.1")
+    service = evaluation_server.EvaluationService()
+
+    poll(service, str(root_path))
+    assert service.status_json()["cached_scenes"] == 3
+    assert service.watch_errors == {}
+
+    build_scene_shards.build_shard(threshold_directory_path, "scenes")
+    shard_file_path = os.path.join(threshold_directory_path, "scenes.jsonl")
+    os.utime(shard_file_path, ns=(2_000_000_000, 2_000_000_000))
+    copy_scenes(threshold_directory_path, scene_file_paths[3:5], 3_000_000_000)
+    poll(service, str(root_path))
+    assert service.sweep_json(str(root_path))["thresholds"]["0.1"]["scenes"] == 5
+
+    # Rewriting a scene the shard covers makes it stale, and removing another leaves it unusable
+    copy_scenes(threshold_directory_path, scene_file_paths[:1], 4_000_000_000)
+    os.remove(os.path.join(threshold_directory_path, os.path.basename(scene_file_paths[1])))
+    refresh_time = service.last_refresh_time
+    poll(service, str(root_path))
+    assert "must be rebuilt" in service.status_json()["watch_errors"][str(root_path)]
+    assert service.last_refresh_time > refresh_time
+
+    # The watch carries on once the shard is rebuilt
+    build_scene_shards.build_shard(threshold_directory_path, "scenes")
+    copy_scenes(threshold_directory_path, scene_file_paths[5:6], 5_000_000_000)
+    poll(service, str(root_path))
+    assert service.watch_errors == {}
+    assert service.sweep_json(str(root_path))["thresholds"]["0.1"]["scenes"] == 5
+
+
+def test_watch_survives_files_removed_while_listing(method_root_path, monkeypatch):
+    root_path, scene_file_paths = method_root_path
+    service = evaluation_server.EvaluationService()
+
+    def removed_file(directory_path):
+        raise FileNotFoundError(f"{directory_path}/scene.json")
+
+    monkeypatch.setattr(scene_shards, "directory_input_file_paths", removed_file)
+    poll(service, str(root_path))
+    assert str(root_path) in service.watch_errors
+
+    monkeypatch.undo()
+    poll(service, str(root_path))
+    assert service.watch_errors == {}
+    assert service.status_json()["cached_scenes"] == 3
+
+
+def test_watch_thread_keeps_polling_after_an_error(method_root_path, monkeypatch):
+    root_path, scene_file_paths = method_root_path
+    service = evaluation_server.EvaluationService()
+    polled = threading.Event()
+    failures = [ValueError("stale shard")]
+    directory_input_file_paths = scene_shards.directory_input_file_paths
+
+    def failing_once(directory_path):
+        if len(failures) > 0:
+            raise failures.pop()
+        polled.set()
+        return directory_input_file_paths(directory_path)
+
+    monkeypatch.setattr(scene_shards, "directory_input_file_paths", failing_once)
+    stop_event = threading.Event()
+    watch_thread = threading.Thread(target=service.watch, args=([str(root_path)], 0.01, stop_event), daemon=True)
+    watch_thread.start()
+    try:
+        assert polled.wait(5.0)
+    finally:
+        stop_event.set()
+        watch_thread.join(5.0)
+
+    assert not watch_thread.is_alive()
+    assert service.status_json()["cached_scenes"] == 3
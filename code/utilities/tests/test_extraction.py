@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+import extract_two_agent_convoy_scenes
+
+
+def extract(monkeypatch, input_directory_path, output_directory_path, *options):
+    monkeypatch.setattr(sys, "argv", ["extract_two_agent_convoy_scenes.py", *options, str(input_directory_path),
+                                      str(output_directory_path)])
+    extract_two_agent_convoy_scenes.main()
+
+
+# The bytes of every file beneath a directory, by its path relative to the directory
+def output_tree(directory_path):
+    tree = {}
+    for root_path, directory_names, file_names in os.walk(directory_path):
+        for file_name in file_names:
+            file_path = os.path.join(root_path, file_name)
+            with open(file_path, "rb") as output_file:
+                tree[os.path.relpath(file_path, directory_path)] = output_file.read()
+    return tree
+
+
+# Extracts the scenes of the synthetic recordings as CSV, JSON meta and trimmed scenes, returning the output tree of each
+def extract_trees(monkeypatch, input_directory_path, output_directory_path, *options):
+    os.makedirs(os.path.join(output_directory_path, "scenes"))
+    os.makedirs(os.path.join(output_directory_path, "trimmed"))
+    extract(monkeypatch, input_directory_path, os.path.join(output_directory_path, "scenes"), "--csv", "--json-meta",
+            "--trimmed-scene-output-path", os.path.join(output_directory_path, "trimmed"), *options)
+    return output_tree(os.path.join(output_directory_path, "scenes")), \
+        output_tree(os.path.join(output_directory_path, "trimmed"))
+
+
+@pytest.fixture(scope="module")
+def serial_trees(synthetic_highd_path, tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        return extract_trees(monkeypatch, synthetic_highd_path, str(tmp_path_factory.mktemp("serial")))
+
+
+def test_serial_extraction_finds_scenes(serial_trees):
+    scene_tree, trimmed_tree = serial_trees
+    assert any(relative_path.endswith(".csv") for relative_path in scene_tree)
+    assert any(relative_path.endswith(".json") for relative_path in scene_tree)
+    assert len(trimmed_tree) > 0
+
+
+# Chunks far smaller than a track split every track over many chunks
+@pytest.mark.parametrize("streaming_chunk_bytes", [4096, 1 << 16, 1 << 22])
+def test_streaming_output_matches(synthetic_highd_path, tmp_path, monkeypatch, serial_trees, streaming_chunk_bytes):
+    assert extract_trees(monkeypatch, synthetic_highd_path, str(tmp_path), "--streaming", "--streaming-chunk-bytes",
+                         str(streaming_chunk_bytes)) == serial_trees
+
+
+def test_parallel_output_matches(synthetic_highd_path, tmp_path, monkeypatch, serial_trees):
+    assert extract_trees(monkeypatch, synthetic_highd_path, str(tmp_path), "--jobs", "2") == serial_trees
+
+
+def test_cached_output_matches(synthetic_highd_path, tmp_path, monkeypatch, capsys, serial_trees):
+    cache_directory_path = tmp_path / "cache"
+    cache_directory_path.mkdir()
+    assert extract_trees(monkeypatch, synthetic_highd_path, str(tmp_path / "first"), "--cache-directory-path",
+                         str(cache_directory_path)) == serial_trees
+    assert "Skipping" not in capsys.readouterr().out
+
+    # The cached parses of the tracks files are used once the output of the first extraction is removed
+    assert extract_trees(monkeypatch, synthetic_highd_path, str(tmp_path / "second"), "--cache-directory-path",
+                         str(cache_directory_path)) == serial_trees
+    assert "Skipping" not in capsys.readouterr().out
+
+
+def test_current_recordings_are_skipped(synthetic_highd_path, tmp_path, monkeypatch, capsys, serial_trees):
+    input_directory_path = tmp_path / "highd"
+    shutil.copytree(synthetic_highd_path, input_directory_path)
+    cache_directory_path = tmp_path / "cache"
+    cache_directory_path.mkdir()
+    output_directory_path = tmp_path / "output"
+    options = ["--csv", "--json-meta", "--cache-directory-path", str(cache_directory_path)]
+
+    os.makedirs(output_directory_path)
+    extract(monkeypatch, input_directory_path, output_directory_path, *options)
+    capsys.readouterr()
+
+    extract(monkeypatch, input_directory_path, output_directory_path, *options)
+    output = capsys.readouterr().out
+    assert "Skipping scene 1 of 2" in output
+    assert "Skipping scene 2 of 2" in output
+    assert "Processing scene" not in output
+    assert output_tree(output_directory_path) == serial_trees[0]
+
+    # Deleted output files extract their own recording again, as does a changed input file
+    for relative_path in output_tree(output_directory_path):
+        if relative_path.startswith("scene-1-"):
+            os.remove(output_directory_path / relative_path)
+    extract(monkeypatch, input_directory_path, output_directory_path, *options)
+    output = capsys.readouterr().out
+    assert "Processing scene 1 of 2" in output
+    assert "Skipping scene 2 of 2" in output
+    assert output_tree(output_directory_path) == serial_trees[0]
+
+    recording_meta_file_path = input_directory_path / "2_recordingMeta.csv"
+    recording_meta = recording_meta_file_path.read_text()
+    assert ",Tue," in recording_meta
+    recording_meta_file_path.write_text(recording_meta.replace(",Tue,", ",Wed,"))
+    extract(monkeypatch, input_directory_path, output_directory_path, *options)
+    output = capsys.readouterr().out
+    assert "Skipping scene 1 of 2" in output
+    assert "Processing scene 2 of 2" in output
+
+    # A changed threshold extracts every recording again
+    extract(monkeypatch, input_directory_path, output_directory_path, *options, "--minimum-time-window-threshold",
+            "11.0")
+    output = capsys.readouterr().out
+    assert "Skipping" not in output
+    assert "Processing scene 1 of 2" in output
+    assert "Processing scene 2 of 2" in output
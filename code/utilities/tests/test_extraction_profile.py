@@ -0,0 +1,14 @@
+import extraction_profile
+
+
+def test_null_profile_stays_inert_when_marked_skipped():
+    extraction_profile.null_profile.skipped = True
+    assert extraction_profile.null_profile.skipped is False
+    assert extraction_profile.null_profile.as_json() is None
+
+
+def test_recording_profile_reports_skipping():
+    profile = extraction_profile.RecordingProfile(3)
+    profile.skipped = True
+    profile.finish()
+    assert profile.as_json()["skipped"] is True
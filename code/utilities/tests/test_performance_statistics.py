@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import evaluate_performance
+from performance_statistics import Resampler, calculate_metrics_array, metric_names, paired_scene_counts, \
+    read_scene_counts
+
+
+# Counts of scenes with five to seven agents, where the link between the convoy head and tail is found in most of them
+def random_scene_counts(seed, scene_count, detection_probability, false_link_probability):
+    rng = np.random.default_rng(seed)
+    total_possible_links = rng.choice([10, 15, 21], size=scene_count)
+    tp_counts = (rng.random(scene_count) < detection_probability).astype(np.int64)
+    fp_counts = rng.binomial(total_possible_links - 1, false_link_probability)
+    fn_counts = 1 - tp_counts
+    return np.stack((tp_counts, fp_counts, fn_counts, total_possible_links - tp_counts - fp_counts - fn_counts), axis=1)
+
+
+@pytest.fixture
+def scene_counts():
+    return random_scene_counts(1, 115, 0.8, 0.1)
+
+
+# Spanning several chunks, so that the chunks are spread over both workers
+def test_results_do_not_depend_on_the_number_of_jobs(scene_counts):
+    other_scene_counts = random_scene_counts(2, 115, 0.7, 0.15)
+    results = []
+    for jobs in (1, 2):
+        resampler = Resampler(2500, 0.95, 7, jobs)
+        try:
+            results.append((resampler.confidence_intervals(scene_counts),
+                            resampler.paired_p_values(scene_counts, other_scene_counts)))
+        finally:
+            resampler.close()
+
+    assert results[0] == results[1]
+
+
+def test_confidence_intervals_contain_the_point_estimates(scene_counts):
+    confidence_intervals = Resampler(2000, 0.95, 3).confidence_intervals(scene_counts)
+    point_estimates = calculate_metrics_array(scene_counts.sum(axis=0))
+    for metric_name, point_estimate in zip(metric_names, point_estimates):
+        lower_bound, upper_bound = confidence_intervals[metric_name]
+        assert lower_bound < point_estimate < upper_bound, metric_name
+
+
+def test_identical_evaluations_are_not_distinguished(scene_counts):
+    p_values = Resampler(500, seed=5).paired_p_values(scene_counts, scene_counts)
+    assert p_values == {metric_name: 1.0 for metric_name in metric_names}
+
+
+# Every scene found by one evaluation and missed with many false links by the other can only be told apart as clearly
+# by swapping all or none of the scenes, which a randomisation of 115 scenes never draws
+def test_clearly_different_evaluations_have_the_smallest_p_value():
+    scene_count = 115
+    found_scene_counts = np.tile([1, 0, 0, 14], (scene_count, 1))
+    missed_scene_counts = np.tile([0, 8, 1, 6], (scene_count, 1))
+    resample_count = 1000
+
+    p_values = Resampler(resample_count, seed=11).paired_p_values(found_scene_counts, missed_scene_counts)
+    for metric_name in metric_names:
+        assert p_values[metric_name] == pytest.approx(1 / (resample_count + 1))
+
+
+def test_paired_scene_counts_pairs_by_name():
+    other_scene_counts = np.array([[1, 0, 0, 5], [0, 2, 1, 3], [1, 1, 0, 4]])
+    paired_counts = paired_scene_counts(["b", "c", "a"], ["a", "b", "c"], other_scene_counts)
+    assert paired_counts.tolist() == [[0, 2, 1, 3], [1, 1, 0, 4], [1, 0, 0, 5]]
+
+
+@pytest.mark.parametrize("other_scene_names", [["a", "b"], ["a", "b", "c", "d"], ["a", "b", "d"]])
+def test_paired_scene_counts_rejects_differing_scenes(other_scene_names):
+    with pytest.raises(ValueError):
+        paired_scene_counts(["a", "b", "c"], other_scene_names, np.zeros((len(other_scene_names), 4)))
+
+
+def test_scene_counts_file_round_trip(tmp_path):
+    scene_file_paths = [tmp_path / "scene-1-2_follows_1-1_independent.json",
+                        tmp_path / "scene-1-5_follows_4-0_independent.json"]
+    scene_file_paths[0].write_text('{"convoy_head_id": 1, "convoy_tail_id": 2, "independent_ids": [3], '
+                                   '"causal_links": {"1": [2], "3": [1]}, "time_elapsed_in_microseconds": 5}')
+    scene_file_paths[1].write_text('{"convoy_head_id": 4, "convoy_tail_id": 5, "independent_ids": [], '
+                                   '"causal_links": {}, "time_elapsed_in_microseconds": 7}')
+    evaluate_performance.evaluate([str(scene_file_path) for scene_file_path in scene_file_paths], "causal_links", 1,
+                                  str(tmp_path / "evaluation.json"),
+                                  scene_counts_output_file_path=str(tmp_path / "scene_counts.csv"))
+
+    scene_names, scene_counts = read_scene_counts(str(tmp_path / "scene_counts.csv"))
+    assert scene_names == ["scene-1-2_follows_1-1_independent", "scene-1-5_follows_4-0_independent"]
+    assert scene_counts.tolist() == [[1, 1, 0, 1], [0, 0, 1, 0]]
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import build_scene_shards
+import scene_shards
+
+
+def write_scene(directory_path, name, modification_time):
+    scene_file_path = os.path.join(directory_path, f"{name}.json")
+    with open(scene_file_path, "w") as scene_file:
+        json.dump({"convoy_head_id": 1, "convoy_tail_id": 2, "independent_ids": [], "causal_links": {},
+                   "time_elapsed_in_microseconds": 1}, scene_file)
+    os.utime(scene_file_path, ns=(modification_time, modification_time))
+    return scene_file_path
+
+
+@pytest.fixture
+def sharded_directory(tmp_path):
+    for name in ["scene-a", "scene-b"]:
+        write_scene(str(tmp_path), name, 1_000_000_000)
+    build_scene_shards.build_shard(str(tmp_path), "scenes")
+    shard_file_path = str(tmp_path / "scenes.jsonl")
+    os.utime(shard_file_path, ns=(2_000_000_000, 2_000_000_000))
+    return tmp_path, shard_file_path
+
+
+def test_shard_replaces_the_scene_files_it_covers(sharded_directory):
+    directory_path, shard_file_path = sharded_directory
+    assert scene_shards.directory_input_file_paths(str(directory_path)) == [shard_file_path]
+
+
+def test_scene_files_written_after_the_shard_are_included(sharded_directory):
+    directory_path, shard_file_path = sharded_directory
+    scene_file_path = write_scene(str(directory_path), "scene-c", 3_000_000_000)
+    assert scene_shards.directory_input_file_paths(str(directory_path)) == [shard_file_path, scene_file_path]
+
+
+def test_shard_older_than_its_scene_files_is_passed_over(sharded_directory):
+    directory_path, shard_file_path = sharded_directory
+    scene_file_paths = [write_scene(str(directory_path), "scene-a", 3_000_000_000),
+                        str(directory_path / "scene-b.json")]
+    assert scene_shards.directory_input_file_paths(str(directory_path)) == scene_file_paths
+
+    os.remove(scene_file_paths[1])
+    with pytest.raises(ValueError):
+        scene_shards.directory_input_file_paths(str(directory_path))
+
+
+def test_shard_bytes_do_not_depend_on_orjson(tmp_path):
+    scene_json = {"convoy_head_id": 1, "time_elapsed_in_microseconds": 1e16, "score": 1e-7, "name": "é"}
+    shard_file_path = str(tmp_path / "scenes.jsonl")
+    with scene_shards.SceneShardWriter(shard_file_path) as shard_writer:
+        shard_writer.add("scene-a", scene_json)
+
+    with open(shard_file_path, "rb") as shard_file:
+        assert shard_file.read() == json.dumps(scene_json, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+    assert scene_shards.SceneShard(shard_file_path).scene("scene-a") == scene_json
+
+
+def test_non_finite_floats_are_refused(tmp_path):
+    shard_file_path = str(tmp_path / "scenes.jsonl")
+    with pytest.raises(ValueError):
+        with scene_shards.SceneShardWriter(shard_file_path) as shard_writer:
+            shard_writer.add("scene-a", {"score": float("nan")})
+    assert os.listdir(str(tmp_path)) == []